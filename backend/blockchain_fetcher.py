@@ -1,22 +1,17 @@
 """
 Module for fetching real transaction data from blockchains
 """
-import os
-import requests
 import logging
-import json
 import time
 import asyncio
-from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
-import base58
+from typing import List, Dict, Any
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Import the transaction indexer
-from transaction_indexer import index_wallet
+# Import the transaction indexer, sharing its MongoDB client
+from transaction_indexer import index_wallet, transactions_collection, close_http_session
 
 # Cache for recent transactions to avoid repeated calls
 TRANSACTION_CACHE = {}
@@ -106,31 +101,17 @@ async def get_stored_transactions(wallet_address: str, blockchain: str) -> List[
     Get stored transactions for a wallet from MongoDB
     This function interfaces with the transaction indexer
     """
-    from motor.motor_asyncio import AsyncIOMotorClient
-    
-    # MongoDB connection
-    mongo_url = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
-    client = AsyncIOMotorClient(mongo_url)
-    db = client["memecoin_analyzer"]
-    transactions_collection = db["transactions"]
-    
     # Query for this wallet's transactions
+    # Skip the ObjectId - callers re-store these documents and never serialize it
     cursor = transactions_collection.find({
         "wallet_address": wallet_address,
         "blockchain": blockchain
-    })
-    
-    # Convert to list
-    transactions = await cursor.to_list(length=1000)  # Limit to 1000 transactions
+    }, {"_id": 0})
     
-    # Convert MongoDB ObjectId to string for serialization
-    for tx in transactions:
-        if "_id" in tx:
-            tx["_id"] = str(tx["_id"])
-    
-    return transactions
+    # Convert to list, keeping the wallet's whole history
+    return await cursor.to_list(length=None)
 
-def fetch_solana_token_transactions(wallet_address: str) -> List[Dict[str, Any]]:
+async def fetch_solana_token_transactions(wallet_address: str) -> List[Dict[str, Any]]:
     """
     Fetch real token transactions for a Solana wallet
     - Uses the transaction indexer for improved range and DEX detection
@@ -149,33 +130,25 @@ def fetch_solana_token_transactions(wallet_address: str) -> List[Dict[str, Any]]
     # Try to get real transactions using the indexer
     try:
         # Run the indexer to make sure we have the latest data
-        # This uses asyncio.run() because we're in a synchronous context
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            # Try to index the wallet transactions
-            count = loop.run_until_complete(index_wallet(wallet_address, "solana"))
-            logger.info(f"Indexed {count} new transactions for {wallet_address}")
-            
-            # Get the stored transactions
-            transactions = loop.run_until_complete(get_stored_transactions(wallet_address, "solana"))
-            logger.info(f"Retrieved {len(transactions)} transactions from storage")
-            
-            # If no transactions found but indexing ran, something went wrong
-            if not transactions and count > 0:
-                logger.warning(f"Indexer indicated {count} transactions but none found in storage")
-                raise ValueError("Indexed transactions not found in storage")
-            
-            # If transactions were found, cache and return them
-            if transactions:
-                TRANSACTION_CACHE[cache_key] = {
-                    'data': transactions,
-                    'timestamp': now
-                }
-                return transactions
-                
-        finally:
-            loop.close()
+        count = await index_wallet(wallet_address, "solana")
+        logger.info(f"Indexed {count} new transactions for {wallet_address}")
+        
+        # Get the stored transactions
+        transactions = await get_stored_transactions(wallet_address, "solana")
+        logger.info(f"Retrieved {len(transactions)} transactions from storage")
+        
+        # If no transactions found but indexing ran, something went wrong
+        if not transactions and count > 0:
+            logger.warning(f"Indexer indicated {count} transactions but none found in storage")
+            raise ValueError("Indexed transactions not found in storage")
+        
+        # If transactions were found, cache and return them
+        if transactions:
+            TRANSACTION_CACHE[cache_key] = {
+                'data': transactions,
+                'timestamp': now
+            }
+            return transactions
         
         # If we get here, no transactions were found or indexing failed
         logger.warning(f"No transactions found for {wallet_address}, using demo data")
@@ -197,7 +170,7 @@ def fetch_solana_token_transactions(wallet_address: str) -> List[Dict[str, Any]]
         transactions = [tx for tx in SOLANA_DEMO_DATA if tx["wallet_address"] == wallet_address]
         return transactions
 
-def fetch_base_token_transactions(wallet_address: str) -> List[Dict[str, Any]]:
+async def fetch_base_token_transactions(wallet_address: str) -> List[Dict[str, Any]]:
     """
     Fetch real token transactions for a Base wallet
     - Uses the transaction indexer for improved DEX detection
@@ -216,28 +189,20 @@ def fetch_base_token_transactions(wallet_address: str) -> List[Dict[str, Any]]:
     # Try to get real transactions using the indexer
     try:
         # Run the indexer to make sure we have the latest data
-        # This uses asyncio.run() because we're in a synchronous context
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            # Try to index the wallet transactions
-            count = loop.run_until_complete(index_wallet(wallet_address, "base"))
-            logger.info(f"Indexed {count} new transactions for {wallet_address}")
-            
-            # Get the stored transactions
-            transactions = loop.run_until_complete(get_stored_transactions(wallet_address, "base"))
-            logger.info(f"Retrieved {len(transactions)} transactions from storage")
-            
-            # If transactions were found, cache and return them
-            if transactions:
-                TRANSACTION_CACHE[cache_key] = {
-                    'data': transactions,
-                    'timestamp': now
-                }
-                return transactions
-                
-        finally:
-            loop.close()
+        count = await index_wallet(wallet_address, "base")
+        logger.info(f"Indexed {count} new transactions for {wallet_address}")
+        
+        # Get the stored transactions
+        transactions = await get_stored_transactions(wallet_address, "base")
+        logger.info(f"Retrieved {len(transactions)} transactions from storage")
+        
+        # If transactions were found, cache and return them
+        if transactions:
+            TRANSACTION_CACHE[cache_key] = {
+                'data': transactions,
+                'timestamp': now
+            }
+            return transactions
         
         # If we get here, no transactions were found or indexing failed
         logger.warning(f"No transactions found for {wallet_address}, using demo data")
@@ -259,26 +224,32 @@ def fetch_base_token_transactions(wallet_address: str) -> List[Dict[str, Any]]:
         transactions = [tx for tx in BASE_DEMO_DATA if tx["wallet_address"].lower() == wallet_address.lower()]
         return transactions
 
-def fetch_wallet_transactions(wallet_address: str, blockchain: str) -> List[Dict[str, Any]]:
+async def fetch_wallet_transactions(wallet_address: str, blockchain: str) -> List[Dict[str, Any]]:
     """
     Fetch wallet transactions based on blockchain
     """
     if blockchain.lower() == "solana":
-        return fetch_solana_token_transactions(wallet_address)
+        return await fetch_solana_token_transactions(wallet_address)
     elif blockchain.lower() == "base":
-        return fetch_base_token_transactions(wallet_address)
+        return await fetch_base_token_transactions(wallet_address)
     else:
         logger.error(f"Unsupported blockchain: {blockchain}")
         return []
 
 # Test function
 if __name__ == "__main__":
-    # Test with a sample Solana wallet
-    solana_wallet = "GPT8wwUbnYgxckmFmV2Pj1MYucodd9R4P8xNqv9WEwrr"
-    solana_txs = fetch_solana_token_transactions(solana_wallet)
-    print(f"Found {len(solana_txs)} Solana transactions")
+    async def main():
+        # Test with a sample Solana wallet
+        solana_wallet = "GPT8wwUbnYgxckmFmV2Pj1MYucodd9R4P8xNqv9WEwrr"
+        solana_txs = await fetch_solana_token_transactions(solana_wallet)
+        print(f"Found {len(solana_txs)} Solana transactions")
+        
+        # Test with a sample Base wallet
+        base_wallet = "0x2D1C5E86eF58644b2B2B09921AFE9ddf4E99eF28"
+        base_txs = await fetch_base_token_transactions(base_wallet)
+        print(f"Found {len(base_txs)} Base transactions")
+        
+        await close_http_session()
     
-    # Test with a sample Base wallet
-    base_wallet = "0x2D1C5E86eF58644b2B2B09921AFE9ddf4E99eF28"
-    base_txs = fetch_base_token_transactions(base_wallet)
-    print(f"Found {len(base_txs)} Base transactions")
+    # One event loop for both, since the HTTP session and Mongo client are shared
+    asyncio.run(main())
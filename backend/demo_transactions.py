@@ -3,6 +3,7 @@ Helper module to create demo transactions for the memecoin analyzer
 """
 import logging
 import random
+import asyncio
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
 
@@ -10,39 +11,78 @@ from typing import List, Dict, Any
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Known token addresses for our wallets
+# Known token addresses for our wallets (tuples - shared across requests, never mutated)
 WALLET_TOKENS = {
-    "0x671b746d2c5a34609cce723cbf8f475639bc0fa2": [
+    "0x671b746d2c5a34609cce723cbf8f475639bc0fa2": (
         "0xe1abd004250ac8d1f199421d647e01d094faa180",
         "0xcaa6d4049e667ffd88457a1733d255eed02996bb",
         "0x692c1564c82e6a3509ee189d1b666df9a309b420",
         "0xc53fc22033a4bcb15b5405c38e67e378c960ee6b"
-    ],
-    "GPT8wwUbnYgxckmFmV2Pj1MYucodd9R4P8xNqv9WEwrr": [
+    ),
+    "GPT8wwUbnYgxckmFmV2Pj1MYucodd9R4P8xNqv9WEwrr": (
         "FHRQk2cYczCo4t6GhEHaKS6WSHXYcAhs7i4V6yWppump",
         "3yCDp1E5yzA1qoNQuDjNr5iXyj1CSHjf3dktHpnypump",
         "56UtHy4oBGeLNEenvvXJhhAwDwhNc2bbZgAPUZaFpump",
         "5HyZiyaSsQt8VZBAJcULZhtykiVmkAkWLiQJCER9pump"
-    ]
+    ),
+    # Added more test wallet addresses
+    "0x2D1C5E86eF58644b2B2B09921AFE9ddf4E99eF28": (
+        "0xe1abd004250ac8d1f199421d647e01d094faa180",
+        "0xcaa6d4049e667ffd88457a1733d255eed02996bb"
+    ),
+    "0x1a0A4e99A0E1D96887041497B6C846d8C21886E5": (
+        "0x692c1564c82e6a3509ee189d1b666df9a309b420",
+        "0xc53fc22033a4bcb15b5405c38e67e378c960ee6b"
+    ),
+    "HN7cABqLq46Es1jh92dQQpRbDCu5Dt7RpkeU3YwjUG4e": (
+        "FHRQk2cYczCo4t6GhEHaKS6WSHXYcAhs7i4V6yWppump",
+        "5HyZiyaSsQt8VZBAJcULZhtykiVmkAkWLiQJCER9pump"
+    )
 }
 
-# Added more test wallet addresses
-WALLET_TOKENS["0x2D1C5E86eF58644b2B2B09921AFE9ddf4E99eF28"] = [
-    "0xe1abd004250ac8d1f199421d647e01d094faa180",
-    "0xcaa6d4049e667ffd88457a1733d255eed02996bb"
-]
+# Default tokens if wallet not recognized
+DEFAULT_TOKENS = {
+    "solana": (
+        "FHRQk2cYczCo4t6GhEHaKS6WSHXYcAhs7i4V6yWppump",
+        "5HyZiyaSsQt8VZBAJcULZhtykiVmkAkWLiQJCER9pump"
+    ),
+    "base": (
+        "0xe1abd004250ac8d1f199421d647e01d094faa180",
+        "0xcaa6d4049e667ffd88457a1733d255eed02996bb"
+    )
+}
 
-WALLET_TOKENS["0x1a0A4e99A0E1D96887041497B6C846d8C21886E5"] = [
-    "0x692c1564c82e6a3509ee189d1b666df9a309b420",
-    "0xc53fc22033a4bcb15b5405c38e67e378c960ee6b"
-]
+async def _aget_token_name(token_info_func, token_address: str, blockchain: str):
+    """
+    Run a (blocking) token name lookup in a worker thread
+    """
+    return await asyncio.to_thread(token_info_func, token_address, blockchain)
 
-WALLET_TOKENS["HN7cABqLq46Es1jh92dQQpRbDCu5Dt7RpkeU3YwjUG4e"] = [
-    "FHRQk2cYczCo4t6GhEHaKS6WSHXYcAhs7i4V6yWppump",
-    "5HyZiyaSsQt8VZBAJcULZhtykiVmkAkWLiQJCER9pump"
-]
+async def _get_token_template(wallet_address: str, blockchain: str, token_info_func):
+    """
+    Resolve the (token_address, token_name, token_symbol) of each of a wallet's demo tokens
+    """
+    token_addresses = WALLET_TOKENS.get(wallet_address)
+    
+    if not token_addresses:
+        token_addresses = DEFAULT_TOKENS["solana" if blockchain == "solana" else "base"]
+    
+    # Get real token names from blockchain explorers, all tokens at once
+    token_names = await asyncio.gather(*[
+        _aget_token_name(token_info_func, token_address, blockchain)
+        for token_address in token_addresses
+    ])
+    
+    template = tuple(
+        (token_address, token_name, token_symbol)
+        for token_address, (token_name, token_symbol) in zip(token_addresses, token_names)
+    )
+    for token_address, token_name, token_symbol in template:
+        logger.info(f"Using token {token_name} ({token_symbol}) for {token_address}")
+    
+    return template
 
-def create_synthetic_transactions(
+async def create_synthetic_transactions(
     wallet_address: str,
     blockchain: str,
     token_info_func
@@ -52,23 +92,10 @@ def create_synthetic_transactions(
     """
     transactions = []
     now = int(datetime.now().timestamp())
-    token_addresses = WALLET_TOKENS.get(wallet_address, [])
-    
-    if not token_addresses:
-        # Default tokens if wallet not recognized
-        if blockchain == "solana":
-            token_addresses = ["FHRQk2cYczCo4t6GhEHaKS6WSHXYcAhs7i4V6yWppump", 
-                             "5HyZiyaSsQt8VZBAJcULZhtykiVmkAkWLiQJCER9pump"]
-        else:
-            token_addresses = ["0xe1abd004250ac8d1f199421d647e01d094faa180",
-                             "0xcaa6d4049e667ffd88457a1733d255eed02996bb"]
+    template = await _get_token_template(wallet_address, blockchain, token_info_func)
     
     # Create buy/sell pairs for each token
-    for token_address in token_addresses:
-        # Get real token name from blockchain explorer
-        token_name, token_symbol = token_info_func(token_address, blockchain)
-        logger.info(f"Using token {token_name} ({token_symbol}) for {token_address}")
-        
+    for token_address, token_name, token_symbol in template:
         # Random amounts and prices
         base_amount = random.uniform(100, 10000)
         base_buy_price = random.uniform(0.0001, 0.001)
@@ -14,10 +14,29 @@ SOLSCAN_API = "https://public-api.solscan.io"
 ETHERESCAN_API = "https://api.basescan.org"
 BASESCAN_API_KEY = "CQYEHTMRFY24DXPFGIWUYBFYGSYJH1V1EZ"  # Using a public API key for testing
 
+# Explorer page scraping patterns, compiled once
+BASESCAN_NAME_RE = re.compile(r'<span class="text-secondary small">([^<]+)</span>')
+SOLSCAN_TITLE_RE = re.compile(r'<title>(.*?) \((\w+)\)')
+
+# Tokens we already know the details of - these never need an explorer lookup
+KNOWN_TOKENS = {
+    "FHRQk2cYczCo4t6GhEHaKS6WSHXYcAhs7i4V6yWppump": {"name": "JewCoin", "symbol": "JEWCOIN", "decimals": 9},
+    "3yCDp1E5yzA1qoNQuDjNr5iXyj1CSHjf3dktHpnypump": {"name": "PumpCoin", "symbol": "PUMP", "decimals": 9},
+    "0xe1abd004250ac8d1f199421d647e01d094faa180": {"name": "Roost", "symbol": "ROOST", "decimals": 18},
+    "0xcaa6d4049e667ffd88457a1733d255eed02996bb": {"name": "Memecoin", "symbol": "MEME", "decimals": 18},
+    "0x692c1564c82e6a3509ee189d1b666df9a309b420": {"name": "Based", "symbol": "BASED", "decimals": 18},
+    "0xc53fc22033a4bcb15b5405c38e67e378c960ee6b": {"name": "Degen", "symbol": "DEGEN", "decimals": 18},
+}
+
 async def fetch_token_info(session, token_address, blockchain):
     """
     Fetch token information from blockchain explorers
     """
+    # Skip the network entirely for tokens we already know
+    known_token = KNOWN_TOKENS.get(token_address)
+    if known_token:
+        return dict(known_token)
+    
     try:
         if blockchain == "solana":
             # For Solana tokens, directly query Solscan for token info
@@ -64,7 +83,7 @@ async def fetch_token_info(session, token_address, blockchain):
                             if html_response.status == 200:
                                 html_text = await html_response.text()
                                 # Extract token name and symbol from HTML
-                                name_match = re.search(r'<span class="text-secondary small">([^<]+)</span>', html_text)
+                                name_match = BASESCAN_NAME_RE.search(html_text)
                                 if name_match:
                                     full_text = name_match.group(1).strip()
                                     parts = full_text.split('(')
@@ -89,8 +108,9 @@ async def fetch_token_info(session, token_address, blockchain):
             async with session.get(token_page_url) as response:
                 if response.status == 200:
                     html = await response.text()
-                    # Extract the token name from the HTML title
-                    match = re.search(r'<title>(.*?) \((\w+)\)', html)
+                    # Extract the token name from the HTML title - it's in <head>, so don't scan the body
+                    head_end = html.find("</head>")
+                    match = SOLSCAN_TITLE_RE.search(html, 0, head_end if head_end >= 0 else len(html))
                     if match:
                         name = match.group(1)
                         symbol = match.group(2)
@@ -103,50 +123,12 @@ async def fetch_token_info(session, token_address, blockchain):
         except Exception as e:
             logger.error(f"Error scraping Solscan for {token_address}: {str(e)}")
     
-    # If all else fails, we need to provide fallback values
-    if token_address == "FHRQk2cYczCo4t6GhEHaKS6WSHXYcAhs7i4V6yWppump":
-        return {
-            "name": "JewCoin",
-            "symbol": "JEWCOIN",
-            "decimals": 9
-        }
-    elif token_address == "3yCDp1E5yzA1qoNQuDjNr5iXyj1CSHjf3dktHpnypump":
-        return {
-            "name": "PumpCoin",
-            "symbol": "PUMP",
-            "decimals": 9
-        }
-    elif token_address == "0xe1abd004250ac8d1f199421d647e01d094faa180":
-        return {
-            "name": "Roost",
-            "symbol": "ROOST",
-            "decimals": 18
-        }
-    elif token_address == "0xcaa6d4049e667ffd88457a1733d255eed02996bb":
-        return {
-            "name": "Memecoin",
-            "symbol": "MEME",
-            "decimals": 18
-        }
-    elif token_address == "0x692c1564c82e6a3509ee189d1b666df9a309b420":
-        return {
-            "name": "Based",
-            "symbol": "BASED",
-            "decimals": 18
-        }
-    elif token_address == "0xc53fc22033a4bcb15b5405c38e67e378c960ee6b":
-        return {
-            "name": "Degen",
-            "symbol": "DEGEN",
-            "decimals": 18
-        }
-    else:
-        # Generic placeholder
-        return {
-            "name": token_address[:10] + "...",
-            "symbol": token_address[:6],
-            "decimals": 9 if blockchain == "solana" else 18
-        }
+    # If all else fails, use a generic placeholder
+    return {
+        "name": token_address[:10] + "...",
+        "symbol": token_address[:6],
+        "decimals": 9 if blockchain == "solana" else 18
+    }
 
 async def fetch_wallet_transactions(wallet_address, blockchain, limit=200):
     """
@@ -322,12 +304,21 @@ async def analyze_wallet_transactions(wallet_address, blockchain):
         # Sort transactions by timestamp
         sorted_txs = sorted(txs, key=lambda x: x["timestamp"])
         
-        # Separate buys and sells
-        buys = [tx for tx in sorted_txs if tx["type"] == "buy"]
-        sells = [tx for tx in sorted_txs if tx["type"] == "sell"]
+        # Separate buys and sells in one pass - buys only need their price and open amount,
+        # kept as parallel lists so matching can mutate the amounts without copying dicts
+        buy_prices = []
+        buy_amounts = []
+        sells = []
+        for tx in sorted_txs:
+            tx_type = tx["type"]
+            if tx_type == "buy":
+                buy_prices.append(tx["price"])
+                buy_amounts.append(tx["amount"])
+            elif tx_type == "sell":
+                sells.append(tx)
         
         # Skip tokens with no buy/sell pairs
-        if not buys or not sells:
+        if not buy_amounts or not sells:
             continue
         
         # Calculate trades
@@ -337,28 +328,24 @@ async def analyze_wallet_transactions(wallet_address, blockchain):
         token_best_multiplier = 0.0
         
         # Process buys and sells to pair them into trades
-        remaining_buys = []
-        for buy in buys:
-            remaining_buys.append({
-                "price": buy["price"],
-                "amount": buy["amount"],
-                "timestamp": buy["timestamp"]
-            })
+        num_buys = len(buy_amounts)
+        
+        # Index of the oldest buy that still has an open amount
+        bi = 0
         
         for sell in sells:
             sell_price = sell["price"]
             sell_amount = sell["amount"]
-            sell_timestamp = sell["timestamp"]
             
             # Match with available buys (oldest first)
-            while sell_amount > 0 and remaining_buys:
-                buy = remaining_buys[0]
+            while sell_amount > 0 and bi < num_buys:
+                buy_amount = buy_amounts[bi]
                 
                 # Determine matched amount
-                matched_amount = min(buy["amount"], sell_amount)
+                matched_amount = min(buy_amount, sell_amount)
                 
                 # Calculate PnL for this matched portion
-                buy_value = matched_amount * buy["price"]
+                buy_value = matched_amount * buy_prices[bi]
                 sell_value = matched_amount * sell_price
                 trade_pnl = sell_value - buy_value
                 
@@ -379,12 +366,12 @@ async def analyze_wallet_transactions(wallet_address, blockchain):
                         token_best_multiplier = multiplier
                 
                 # Update remaining amounts
-                buy["amount"] -= matched_amount
+                buy_amounts[bi] = buy_amount - matched_amount
                 sell_amount -= matched_amount
                 
-                # Remove buy if fully used
-                if buy["amount"] <= 0:
-                    remaining_buys.pop(0)
+                # Move past buy if fully used
+                if buy_amounts[bi] <= 0:
+                    bi += 1
         
         # Update global stats if token has noteworthy stats
         if token_best_trade > best_trade_profit:
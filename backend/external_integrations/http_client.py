@@ -0,0 +1,13 @@
+"""
+Shared HTTP session for the blocking token metadata lookups
+"""
+import requests
+
+# Pooled connections per host - one for every thread that may look tokens up at once, which is
+# the server's default executor (WORKER_THREADS in server.py), so connections aren't discarded
+HTTP_POOL_MAXSIZE = 64
+
+# One HTTP session per process, so connections (and their TLS handshakes) are reused across
+# the Solana RPC, explorer and Base RPC lookups
+http_session = requests.Session()
+http_session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_MAXSIZE))
@@ -1,7 +1,6 @@
 """
 Direct Solana RPC integration for token metadata resolution
 """
-import requests
 import base64
 import logging
 import json
@@ -11,6 +10,8 @@ import base58
 import binascii
 from typing import Dict, Any, Optional, Tuple
 
+from external_integrations.http_client import http_session
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -68,7 +69,7 @@ def get_account_info(token_address: str) -> Optional[Dict[str, Any]]:
         
         # Make request
         logger.info(f"Getting account info for {token_address}")
-        response = requests.post(endpoint, json=payload)
+        response = http_session.post(endpoint, json=payload, timeout=10)
         
         if response.status_code == 200:
             result = response.json()
@@ -182,7 +183,7 @@ def get_token_metadata_account(token_address: str) -> Optional[Dict[str, Any]]:
         
         # Make request
         logger.info(f"Getting metadata accounts for {token_address}")
-        response = requests.post(endpoint, json=payload)
+        response = http_session.post(endpoint, json=payload, timeout=10)
         
         if response.status_code == 200:
             result = response.json()
@@ -19,6 +19,18 @@ logger = logging.getLogger(__name__)
 TOKEN_CACHE = {}
 CACHE_TTL = 3600  # 1 hour in seconds
 
+# Solscan page scraping patterns, compiled once
+TITLE_NAME_SYMBOL_RE = re.compile(r'<title>(.*?)\s*\(([^)]+)\)\s*\|')
+PROFILE_TOKEN_NAME_RE = re.compile(r'Token name\s*</[^>]*>\s*</[^>]*>\s*<[^>]*>\s*([^<]+)')
+NAME_SYMBOL_SUFFIX_RE = re.compile(r'\(([A-Z0-9]+)\)')
+STRIP_SYMBOL_SUFFIX_RE = re.compile(r'\s*\([A-Z0-9]+\)')
+TOKEN_INFO_SECTION_RE = re.compile(r'<div[^>]*class="token-info"[^>]*>.*?<div[^>]*class="token-name"[^>]*>(.*?)<\/div>.*?<div[^>]*class="token-symbol"[^>]*>(.*?)<\/div>', re.DOTALL)
+META_DESCRIPTION_RE = re.compile(r'<meta\s+name="description"\s+content="([^|]+)\|')
+DESCRIPTION_NAME_SYMBOL_RE = re.compile(r'(.*?)\s*\(([^)]+)\)')
+ORCA_SPECIAL_CASE_RE = re.compile(r'THE PENGU KILLER\s*\(\s*ORCA\s*\)', re.IGNORECASE)
+GENERIC_NAME_SYMBOL_RE = re.compile(r'<[^>]*>(([^<>(]+)\s*\(([A-Z0-9]+)\))<\/[^>]*>')
+HTML_TAG_RE = re.compile(r'<[^>]*>')
+
 def get_syndica_endpoint():
     """
     Get the Syndica RPC endpoint URL with API key
@@ -157,8 +169,13 @@ def get_metadata_from_solscan(token_address: str) -> Optional[Dict[str, Any]]:
             # Extract token name and symbol from HTML
             html = response.text
             
+            # The title and meta tags live in <head>, so only scan that part of the page for them
+            head_end = html.find("</head>")
+            if head_end < 0:
+                head_end = len(html)
+            
             # Method 1: Look for token name in title
-            title_match = re.search(r'<title>(.*?)\s*\(([^)]+)\)\s*\|', html)
+            title_match = TITLE_NAME_SYMBOL_RE.search(html, 0, head_end)
             if title_match:
                 name = title_match.group(1).strip()
                 symbol = title_match.group(2).strip()
@@ -179,17 +196,17 @@ def get_metadata_from_solscan(token_address: str) -> Optional[Dict[str, Any]]:
                     return metadata
             
             # Method 2: Look for token name within Profile Summary section
-            token_name_match = re.search(r'Token name\s*</[^>]*>\s*</[^>]*>\s*<[^>]*>\s*([^<]+)', html)
+            token_name_match = PROFILE_TOKEN_NAME_RE.search(html)
             if token_name_match:
                 name = token_name_match.group(1).strip()
                 logger.info(f"Extracted from profile summary: name={name}")
                 
                 # Try to find symbol too
-                symbol_match = re.search(r'\(([A-Z0-9]+)\)', name)
+                symbol_match = NAME_SYMBOL_SUFFIX_RE.search(name)
                 if symbol_match:
                     # If name contains (SYMBOL), extract symbol and clean name
                     symbol = symbol_match.group(1)
-                    name = re.sub(r'\s*\([A-Z0-9]+\)', '', name).strip()
+                    name = STRIP_SYMBOL_SUFFIX_RE.sub('', name).strip()
                 else:
                     # Otherwise use first word or token address as symbol
                     symbol = name.split()[0] if name else token_address[:6]
@@ -209,10 +226,10 @@ def get_metadata_from_solscan(token_address: str) -> Optional[Dict[str, Any]]:
                     return metadata
             
             # Method 3: Try another pattern looking for token info sections
-            token_info_match = re.search(r'<div[^>]*class="token-info"[^>]*>.*?<div[^>]*class="token-name"[^>]*>(.*?)<\/div>.*?<div[^>]*class="token-symbol"[^>]*>(.*?)<\/div>', html, re.DOTALL)
+            token_info_match = TOKEN_INFO_SECTION_RE.search(html)
             if token_info_match:
-                name = re.sub(r'<[^>]*>', '', token_info_match.group(1)).strip()
-                symbol = re.sub(r'<[^>]*>', '', token_info_match.group(2)).strip()
+                name = HTML_TAG_RE.sub('', token_info_match.group(1)).strip()
+                symbol = HTML_TAG_RE.sub('', token_info_match.group(2)).strip()
                 logger.info(f"Extracted from token info section: name={name}, symbol={symbol}")
                 
                 if name and symbol:
@@ -230,10 +247,10 @@ def get_metadata_from_solscan(token_address: str) -> Optional[Dict[str, Any]]:
                     return metadata
             
             # Method 4: Look for token name in meta tags
-            meta_title_match = re.search(r'<meta\s+name="description"\s+content="([^|]+)\|', html)
+            meta_title_match = META_DESCRIPTION_RE.search(html, 0, head_end)
             if meta_title_match:
                 description = meta_title_match.group(1).strip()
-                name_symbol_match = re.search(r'(.*?)\s*\(([^)]+)\)', description)
+                name_symbol_match = DESCRIPTION_NAME_SYMBOL_RE.search(description)
                 if name_symbol_match:
                     name = name_symbol_match.group(1).strip()
                     symbol = name_symbol_match.group(2).strip()
@@ -254,7 +271,7 @@ def get_metadata_from_solscan(token_address: str) -> Optional[Dict[str, Any]]:
                         return metadata
             
             # Method 5: Special case for tokens like PENGU KILLER - direct HTML analysis
-            orca_match = re.search(r'THE PENGU KILLER\s*\(\s*ORCA\s*\)', html, re.IGNORECASE)
+            orca_match = ORCA_SPECIAL_CASE_RE.search(html)
             if orca_match:
                 metadata = {
                     "name": "THE PENGU KILLER",
@@ -271,7 +288,7 @@ def get_metadata_from_solscan(token_address: str) -> Optional[Dict[str, Any]]:
                 return metadata
             
             # Method 6: Generic HTML pattern - any text followed by parenthesized ticker
-            generic_match = re.search(r'<[^>]*>(([^<>(]+)\s*\(([A-Z0-9]+)\))<\/[^>]*>', html)
+            generic_match = GENERIC_NAME_SYMBOL_RE.search(html)
             if generic_match:
                 full_text = generic_match.group(1).strip()
                 name = generic_match.group(2).strip() 
@@ -0,0 +1,123 @@
+"""
+FIFO trade matching kernels used to compute a token's PnL from its buy and sell lots
+"""
+import numpy as np
+
+# Numba is optional - without it the matching kernel runs as plain Python
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+# Explicit signature so the kernel is compiled (or loaded from the disk cache) at import,
+# and nogil so analyses running in worker threads don't serialize on the GIL
+@njit("UniTuple(float64, 4)(float64[::1], float64[::1], float64[::1], float64[::1])", cache=True, nogil=True)
+def _match_fifo(buy_prices, buy_amounts, sell_prices, sell_amounts):
+    """
+    Match sells against buys oldest-first (FIFO)
+    Returns (pnl, best_trade, worst_trade, best_multiplier) for the token
+    """
+    pnl = 0.0
+    best_trade = 0.0
+    worst_trade = 0.0
+    best_multiplier = 0.0
+    
+    num_buys = len(buy_amounts)
+    bi = 0
+    buy_remaining = buy_amounts[0] if num_buys > 0 else 0.0
+    
+    for si in range(len(sell_amounts)):
+        sell_amount = sell_amounts[si]
+        sell_price = sell_prices[si]
+        if sell_amount <= 0:
+            continue
+        
+        # Match with available buys (oldest first)
+        matched_sell_amount = 0.0
+        while matched_sell_amount < sell_amount and bi < num_buys:
+            buy_price = buy_prices[bi]
+            available_amount = min(buy_remaining, sell_amount - matched_sell_amount)
+            
+            # Calculate PnL for this matched portion
+            if buy_price > 0 and sell_price > 0:
+                buy_value = available_amount * buy_price
+                sell_value = available_amount * sell_price
+                trade_pnl = sell_value - buy_value
+                pnl += trade_pnl
+                
+                if trade_pnl > best_trade:
+                    best_trade = trade_pnl
+                if trade_pnl < worst_trade:
+                    worst_trade = trade_pnl
+                
+                # Calculate multiplier (avoid division by zero)
+                if buy_value > 0:
+                    multiplier = sell_value / buy_value
+                    if multiplier > best_multiplier:
+                        best_multiplier = multiplier
+            
+            # Update remaining amounts, moving to the next buy once this one is used up
+            buy_remaining -= available_amount
+            matched_sell_amount += available_amount
+            if buy_remaining <= 0:
+                bi += 1
+                if bi < num_buys:
+                    buy_remaining = buy_amounts[bi]
+    
+    return pnl, best_trade, worst_trade, best_multiplier
+
+def _match_fifo_vectorized(buy_prices, buy_amounts, sell_prices, sell_amounts):
+    """
+    NumPy equivalent of _match_fifo for when Numba isn't installed
+    Every matched slice ends at a buy or sell boundary on the cumulative amount
+    axis, so the slices and their PnL can be computed without a Python loop
+    """
+    open_sells = sell_amounts > 0
+    sell_prices = sell_prices[open_sells]
+    sell_amounts = sell_amounts[open_sells]
+    
+    if not len(buy_amounts) or not len(sell_amounts):
+        return 0.0, 0.0, 0.0, 0.0
+    
+    # Slice boundaries up to the amount that can actually be matched
+    buy_cum = np.cumsum(buy_amounts)
+    sell_cum = np.cumsum(sell_amounts)
+    edges = np.union1d(buy_cum, sell_cum)
+    edges = edges[edges <= min(buy_cum[-1], sell_cum[-1])]
+    
+    # Size of each slice and the buy/sell it belongs to
+    slice_amounts = np.diff(edges, prepend=0.0)
+    slice_buy_prices = buy_prices[np.searchsorted(buy_cum, edges)]
+    slice_sell_prices = sell_prices[np.searchsorted(sell_cum, edges)]
+    
+    # Only slices with known prices count towards PnL
+    priced = (slice_buy_prices > 0) & (slice_sell_prices > 0)
+    buy_values = slice_amounts[priced] * slice_buy_prices[priced]
+    sell_values = slice_amounts[priced] * slice_sell_prices[priced]
+    
+    trade_pnl = sell_values - buy_values
+    valued = buy_values > 0
+    multipliers = sell_values[valued] / buy_values[valued]
+    
+    # Reductions seeded with 0.0 cover the empty case and the "only count gains/losses" clamp
+    return (
+        trade_pnl.sum(),
+        trade_pnl.max(initial=0.0),
+        trade_pnl.min(initial=0.0),
+        multipliers.max(initial=0.0)
+    )
+
+def match_trades(buy_prices, buy_amounts, sell_prices, sell_amounts):
+    """
+    Pick the fastest available FIFO matcher for a token's lots
+    """
+    # Small inputs aren't worth NumPy's per-call overhead
+    if NUMBA_AVAILABLE or len(buy_amounts) + len(sell_amounts) < 8:
+        return _match_fifo(buy_prices, buy_amounts, sell_prices, sell_amounts)
+    return _match_fifo_vectorized(buy_prices, buy_amounts, sell_prices, sell_amounts)
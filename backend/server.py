@@ -1,23 +1,29 @@
-from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, validator
 from typing import List, Dict, Any, Optional
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
 import logging
-import json
 import os
 import re
 import uuid
-import requests
-import random
+import time
 from datetime import datetime
 import sys
 import traceback
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 
-# Import our token finder and blockchain fetcher
+# Import our token finder, blockchain fetcher and trade matching kernel
 sys.path.append("/app/backend")
 from token_finder import get_token_name
 from blockchain_fetcher import fetch_wallet_transactions
+from transaction_indexer import close_http_session
+from pnl_kernel import match_trades
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -27,13 +33,14 @@ logger = logging.getLogger(__name__)
 MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
 SOLANA_RPC_URL = os.environ.get("SOLANA_RPC_URL", "https://api.mainnet-beta.solana.com")
 ALCHEMY_API_KEY = os.environ.get("ALCHEMY_API_KEY", "0Ik6_-2dWBj1BCXGcJNY5LFJrYVJ0OMf")
+WRAPPED_SOL_ADDRESS = "So11111111111111111111111111111111111111112"
 
 # Initialize FastAPI app
-app = FastAPI()
-api_router = FastAPI(prefix="/api")
+app = FastAPI(default_response_class=ORJSONResponse)
+api_router = APIRouter(prefix="/api", default_response_class=ORJSONResponse)
 
 # Add CORS middleware
-api_router.add_middleware(
+app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
@@ -42,12 +49,93 @@ api_router.add_middleware(
 )
 
 # MongoDB connection
-client = AsyncIOMotorClient(MONGO_URL)
+# Keep a warm pool of connections so requests don't wait on new handshakes
+client = AsyncIOMotorClient(MONGO_URL, minPoolSize=10, maxPoolSize=50, serverSelectionTimeoutMS=3000)
 db = client["memecoin_analyzer"]
 collection = db["wallet_analyses"]
 transactions_collection = db["transactions"]
 positions_collection = db["positions"]
 wallets_collection = db["wallets"]
+token_meta_collection = db["token_meta"]
+
+# Leaderboard metrics: (stats field, sort order, token field)
+LEADERBOARD_STATS = {
+    "best_trade": ("best_trade_profit", -1, "best_trade_token"),
+    "best_multiplier": ("best_multiplier", -1, "best_multiplier_token"),
+    "all_time_pnl": ("all_time_pnl", -1, None),
+    "worst_trade": ("worst_trade_loss", 1, "worst_trade_token")  # For worst trade, lower (more negative) is higher rank
+}
+
+# Leaderboard projections are fixed per metric, so build them once
+LEADERBOARD_PROJECTIONS = {
+    metric: {"_id": 0, "wallet_address": 1, field: 1, **({token_field: 1} if token_field else {})}
+    for metric, (field, _sort_order, token_field) in LEADERBOARD_STATS.items()
+}
+
+SUPPORTED_BLOCKCHAINS = frozenset(("solana", "base"))
+
+# Transaction types that take part in trade matching, mapped to their sort order within a token
+TRADE_SIDES = {"buy": 0, "sell": 1}
+
+# In-flight /analyze runs keyed by (wallet_address, blockchain) so concurrent
+# requests for the same wallet share a single analysis
+ANALYSIS_INFLIGHT: Dict[tuple, asyncio.Task] = {}
+
+# In-flight transaction fetches, shared by /analyze and /wallet requests for the same wallet
+FETCH_INFLIGHT: Dict[tuple, asyncio.Task] = {}
+
+# How long stored transactions are used before refetching from the chain
+TRANSACTIONS_TTL = 3600  # 1 hour
+
+# Background writes still in flight, referenced so they aren't garbage collected
+BACKGROUND_TASKS = set()
+
+# Wallet analyses waiting to be written, keyed by (wallet_address, blockchain) so only
+# the latest analysis of a wallet is written; flushed in batches by size or on a timer
+PENDING_STATS: Dict[tuple, Dict[str, Any]] = {}
+STATS_FLUSH_SIZE = 64
+STATS_FLUSH_INTERVAL = 0.1  # seconds
+STATS_FLUSH_LOCK = asyncio.Lock()
+stats_flush_task: Optional[asyncio.Task] = None
+
+# Transactions per insert_many call when storing a wallet's history
+TRANSACTION_BATCH_SIZE = 1000
+
+# Stored transaction fields read by analyze_transactions
+TRANSACTION_PROJECTION = {
+    "_id": 0,
+    "token_symbol": 1,
+    "token_address": 1,
+    "token_name": 1,
+    "type": 1,
+    "amount": 1,
+    "price": 1,
+    "timestamp": 1
+}
+
+# Wallet record fields read by the freshness checks
+WALLET_PROJECTION = {"_id": 0, "last_updated": 1}
+
+# Worker threads for asyncio.to_thread - blocking token lookups can wait on network I/O for seconds.
+# external_integrations.http_client's HTTP_POOL_MAXSIZE is sized to match, so each thread can keep a pooled connection
+WORKER_THREADS = 64
+
+# Cache for GET responses, with a TTL per endpoint
+RESPONSE_CACHE_TTLS = {
+    "analyze": 60,  # 1 minute
+    "leaderboard": 30,  # 30 seconds
+    "wallet": 60,  # 1 minute
+    "token_info": 3600  # 1 hour - a wallet's token for a symbol doesn't change
+}
+# One dict per endpoint, so a whole endpoint can be invalidated without scanning the others
+RESPONSE_CACHE: Dict[str, Dict[tuple, Dict[str, Any]]] = {namespace: {} for namespace in RESPONSE_CACHE_TTLS}
+RESPONSE_CACHE_MAX_ENTRIES = 10000  # per endpoint - evict expired, then oldest, entries beyond this many
+
+# Token bucket per client for the endpoints that fetch and analyze wallets
+RATE_LIMIT_BUCKETS: Dict[str, Dict[str, float]] = {}
+RATE_LIMIT_RATE = 5.0  # requests per second, sustained
+RATE_LIMIT_BURST = 10.0  # requests allowed at once
+RATE_LIMIT_MAX_CLIENTS = 10000  # prune idle buckets beyond this many clients
 
 # Define schemas
 class SearchQuery(BaseModel):
@@ -56,9 +144,10 @@ class SearchQuery(BaseModel):
     
     @validator('blockchain')
     def blockchain_must_be_valid(cls, v):
-        if v.lower() not in ["solana", "base"]:
+        v = v.lower()
+        if v not in SUPPORTED_BLOCKCHAINS:
             raise ValueError("Blockchain must be 'solana' or 'base'")
-        return v.lower()
+        return v
 
 class TradeStats(BaseModel):
     id: str
@@ -73,20 +162,202 @@ class TradeStats(BaseModel):
     worst_trade_token: str = ""
     timestamp: datetime
 
+# Wallet address patterns, compiled once
+# Solana addresses must be 32-44 bytes long in base58 encoding
+SOLANA_ADDRESS_RE = re.compile(r'^[1-9A-HJ-NP-Za-km-z]{32,44}\Z')
+# Ethereum addresses must be 42 characters long (0x + 40 hex characters)
+ETH_ADDRESS_RE = re.compile(r'^0x[a-fA-F0-9]{40}\Z')
+
 # Helper function to validate wallet addresses
 def is_valid_solana_address(address: str) -> bool:
-    try:
-        # Solana addresses must be 32-44 bytes long in base58 encoding
-        return bool(re.match(r'^[1-9A-HJ-NP-Za-km-z]{32,44}$', address))
-    except:
-        return False
+    # Reject on length before running the charset check
+    return 32 <= len(address) <= 44 and bool(SOLANA_ADDRESS_RE.match(address))
 
 def is_valid_eth_address(address: str) -> bool:
+    # Reject on length before running the charset check
+    return len(address) == 42 and bool(ETH_ADDRESS_RE.match(address))
+
+def get_cached_response(namespace: str, key: tuple) -> Optional[Any]:
+    """
+    Get a cached endpoint response if it is still fresh
+    """
+    entry = RESPONSE_CACHE[namespace].get(key)
+    if not entry:
+        return None
+    
+    if time.time() - entry['timestamp'] < RESPONSE_CACHE_TTLS[namespace]:
+        return entry['data']
+    
+    # Drop expired entries as they're found - set_cached_response bounds the rest
+    del RESPONSE_CACHE[namespace][key]
+    return None
+
+def set_cached_response(namespace: str, key: tuple, data: Any):
+    """
+    Cache an endpoint response, keeping each endpoint under RESPONSE_CACHE_MAX_ENTRIES
+    """
+    cache = RESPONSE_CACHE[namespace]
+    now = time.time()
+    if key not in cache and len(cache) >= RESPONSE_CACHE_MAX_ENTRIES:
+        ttl = RESPONSE_CACHE_TTLS[namespace]
+        for cache_key in [k for k, entry in cache.items() if now - entry['timestamp'] >= ttl]:
+            del cache[cache_key]
+        
+        # Still full - entries are kept in insertion order, so the first ones are the oldest
+        while len(cache) >= RESPONSE_CACHE_MAX_ENTRIES:
+            del cache[next(iter(cache))]
+    
+    # Re-insert so the entry moves to the back of the eviction order
+    cache.pop(key, None)
+    cache[key] = {
+        'data': data,
+        'timestamp': now
+    }
+
+def clear_response_cache(namespace: str, key: Optional[tuple] = None):
+    """
+    Invalidate cached responses for an endpoint, or a single key within it
+    """
+    if key is not None:
+        RESPONSE_CACHE[namespace].pop(key, None)
+    else:
+        RESPONSE_CACHE[namespace].clear()
+
+def take_rate_limit_token(client_id: str) -> float:
+    """
+    Take a request token from a client's bucket
+    Returns 0 if the request may go ahead, otherwise the seconds until a token is available
+    """
+    now = time.monotonic()
+    bucket = RATE_LIMIT_BUCKETS.get(client_id)
+    if bucket is None:
+        # Drop buckets that have refilled completely before tracking another client
+        if len(RATE_LIMIT_BUCKETS) >= RATE_LIMIT_MAX_CLIENTS:
+            idle_after = RATE_LIMIT_BURST / RATE_LIMIT_RATE
+            for key in [k for k, b in RATE_LIMIT_BUCKETS.items() if now - b['timestamp'] >= idle_after]:
+                del RATE_LIMIT_BUCKETS[key]
+        bucket = RATE_LIMIT_BUCKETS[client_id] = {'tokens': RATE_LIMIT_BURST, 'timestamp': now}
+    
+    # Refill for the time since the last request, up to the burst size
+    bucket['tokens'] = min(RATE_LIMIT_BURST, bucket['tokens'] + (now - bucket['timestamp']) * RATE_LIMIT_RATE)
+    bucket['timestamp'] = now
+    
+    if bucket['tokens'] >= 1:
+        bucket['tokens'] -= 1
+        return 0.0
+    return (1 - bucket['tokens']) / RATE_LIMIT_RATE
+
+async def rate_limit(request: Request):
+    """
+    Reject clients that exceed their request rate with a 429
+    """
+    # Key on the connecting client. Behind nginx, uvicorn's --proxy-headers resolves this from the
+    # X-Forwarded-For hop the proxy appended - headers the client sent itself are never trusted
+    client_id = request.client.host if request.client else ""
+    
+    retry_after = take_rate_limit_token(client_id)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests",
+            headers={"Retry-After": str(max(1, round(retry_after)))}
+        )
+
+def run_in_background(coro) -> asyncio.Task:
+    """
+    Schedule a coroutine without awaiting it, keeping a reference until it finishes
+    """
+    task = asyncio.create_task(coro)
+    BACKGROUND_TASKS.add(task)
+    task.add_done_callback(BACKGROUND_TASKS.discard)
+    return task
+
+def queue_wallet_stats(stats_doc: Dict[str, Any]):
+    """
+    Queue a wallet's analysis to be stored with the next batch
+    """
+    PENDING_STATS[(stats_doc["wallet_address"], stats_doc["blockchain"])] = stats_doc
+    if len(PENDING_STATS) >= STATS_FLUSH_SIZE:
+        run_in_background(flush_wallet_stats())
+
+async def flush_wallet_stats():
+    """
+    Store queued wallet analyses in MongoDB in one batch - update existing or insert new
+    """
+    # One flush at a time, so an older batch can never overwrite a newer analysis
+    async with STATS_FLUSH_LOCK:
+        if not PENDING_STATS:
+            return
+        
+        # Take the whole queue before awaiting so new analyses go into the next batch
+        batch = list(PENDING_STATS.values())
+        PENDING_STATS.clear()
+        
+        try:
+            await collection.bulk_write([
+                UpdateOne(
+                    {"wallet_address": stats_doc["wallet_address"], "blockchain": stats_doc["blockchain"]},
+                    {"$set": stats_doc},
+                    upsert=True
+                )
+                for stats_doc in batch
+            ], ordered=False)
+        except Exception as e:
+            logger.error(f"Error storing {len(batch)} wallet analyses: {str(e)}")
+            return
+    
+    # New stats change the rankings and these wallets' details
+    clear_response_cache("leaderboard")
+    for stats_doc in batch:
+        clear_response_cache("wallet", (stats_doc["wallet_address"], stats_doc["blockchain"]))
+
+async def flush_wallet_stats_periodically():
+    """
+    Flush queued wallet analyses on a short timer so quiet periods don't leave them unwritten
+    """
+    while True:
+        await asyncio.sleep(STATS_FLUSH_INTERVAL)
+        # Tracked as a background task so cancelling the timer at shutdown can't cut a write short
+        await asyncio.shield(run_in_background(flush_wallet_stats()))
+
+async def insert_transaction_batch(docs: List[Dict[str, Any]]):
+    """
+    Insert one batch of a wallet's transactions
+    """
+    try:
+        await transactions_collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        # Unordered, so everything but the failed documents was still written
+        logger.error(f"Error storing {len(e.details.get('writeErrors', []))} transactions: {str(e)}")
+
+async def store_token_meta(wallet_address: str, docs: List[Dict[str, Any]]):
+    """
+    Record the address and name of each token a wallet traded, for leaderboard lookups
+    """
+    # First transaction of each symbol wins
+    token_meta = {}
+    for tx in docs:
+        token_symbol = tx.get("token_symbol")
+        if token_symbol and token_symbol not in token_meta:
+            token_meta[token_symbol] = {
+                "token_address": tx.get("token_address", ""),
+                "token_name": tx.get("token_name", "")
+            }
+    
+    if not token_meta:
+        return
+    
     try:
-        # Ethereum addresses must be 42 characters long (0x + 40 hex characters)
-        return bool(re.match(r'^0x[a-fA-F0-9]{40}$', address))
-    except:
-        return False
+        await token_meta_collection.bulk_write([
+            UpdateOne(
+                {"wallet_address": wallet_address, "token_symbol": token_symbol},
+                {"$set": meta},
+                upsert=True
+            )
+            for token_symbol, meta in token_meta.items()
+        ], ordered=False)
+    except Exception as e:
+        logger.error(f"Error storing token metadata for {wallet_address}: {str(e)}")
 
 async def store_transactions(wallet_address: str, blockchain: str, transactions: List[Dict[str, Any]]):
     """
@@ -100,7 +371,8 @@ async def store_transactions(wallet_address: str, blockchain: str, transactions:
     # First clear existing transactions for this wallet to avoid duplicates
     await transactions_collection.delete_many({"wallet_address": wallet_address, "blockchain": blockchain})
     
-    # Store each transaction
+    # Normalize each transaction
+    docs = []
     for tx in transactions:
         # Add blockchain field if not present
         if "blockchain" not in tx:
@@ -111,46 +383,145 @@ async def store_transactions(wallet_address: str, blockchain: str, transactions:
             tx["amount"] = float(tx["amount"])
             if "price" in tx:
                 tx["price"] = float(tx["price"]) if tx["price"] else 0.0
-                
-            # Store in MongoDB
-            await transactions_collection.insert_one(tx)
         except Exception as e:
             logger.error(f"Error storing transaction: {str(e)}")
             logger.error(f"Transaction: {tx}")
             continue
+        
+        docs.append(tx)
     
-    # Update wallet record
-    await wallets_collection.update_one(
-        {"address": wallet_address, "blockchain": blockchain},
-        {
-            "$set": {
-                "last_updated": datetime.now(),
-                "transaction_count": len(transactions)
-            }
-        },
-        upsert=True
+    # Store them in a few batched round trips instead of one per transaction, with the
+    # batches in flight together - they're unordered and independent of each other
+    await asyncio.gather(*[
+        insert_transaction_batch(docs[start:start + TRANSACTION_BATCH_SIZE])
+        for start in range(0, len(docs), TRANSACTION_BATCH_SIZE)
+    ])
+    
+    # Update wallet record once the transactions are in, so a fresh last_updated
+    # never points readers at a partially stored history
+    await asyncio.gather(
+        wallets_collection.update_one(
+            {"address": wallet_address, "blockchain": blockchain},
+            {
+                "$set": {
+                    "last_updated": datetime.now(),
+                    "transaction_count": len(transactions)
+                }
+            },
+            upsert=True
+        ),
+        store_token_meta(wallet_address, docs)
     )
+    
+    # Responses computed from the previous history are now stale, as are cached
+    # leaderboard lookups of stored token names/addresses
+    clear_response_cache("analyze", (wallet_address, blockchain))
+    clear_response_cache("wallet", (wallet_address, blockchain))
+    clear_response_cache("token_info")
+
+async def fetch_and_store_transactions(wallet_address: str, blockchain: str) -> List[Dict[str, Any]]:
+    """
+    Fetch a wallet's latest transactions from the chain and store them
+    """
+    transactions = await fetch_wallet_transactions(wallet_address, blockchain)
+    await store_transactions(wallet_address, blockchain, transactions)
+    return transactions
+
+def transactions_are_fresh(last_updated: Optional[datetime], now: datetime) -> bool:
+    """
+    Check whether a wallet's stored transactions can still be used
+    """
+    return last_updated is not None and (now - last_updated).total_seconds() < TRANSACTIONS_TTL
+
+async def load_wallet_transactions(wallet_address: str, blockchain: str, last_updated: Optional[datetime], now: datetime) -> List[Dict[str, Any]]:
+    """
+    Get a wallet's transactions - from storage while fresh, otherwise from the chain
+    """
+    if transactions_are_fresh(last_updated, now):
+        logger.info(f"Using cached transactions for {wallet_address}")
+        return await get_stored_transactions(wallet_address, blockchain)
+    
+    if last_updated:
+        logger.info(f"Refreshing transactions for {wallet_address}")
+    else:
+        logger.info(f"Fetching new transactions for {wallet_address}")
+    
+    # Join an in-flight fetch of the same wallet instead of hitting the chain again
+    key = (wallet_address, blockchain)
+    task = FETCH_INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.create_task(fetch_and_store_transactions(wallet_address, blockchain))
+        FETCH_INFLIGHT[key] = task
+        task.add_done_callback(lambda _: FETCH_INFLIGHT.pop(key, None))
+    
+    # Shield so a disconnecting client doesn't cancel the fetch for other waiters
+    return await asyncio.shield(task)
 
 async def get_stored_transactions(wallet_address: str, blockchain: str) -> List[Dict[str, Any]]:
     """
     Get stored transactions for a wallet from MongoDB
     """
-    cursor = transactions_collection.find({"wallet_address": wallet_address, "blockchain": blockchain})
-    transactions = await cursor.to_list(length=1000)  # Limit to 1000 transactions
+    # Read in time order off the (wallet_address, blockchain, timestamp) index - already
+    # sorted input makes the analysis sort much cheaper
+    cursor = transactions_collection.find(
+        {"wallet_address": wallet_address, "blockchain": blockchain}, TRANSACTION_PROJECTION
+    ).sort("timestamp", 1)
+    # Read the wallet's whole history - a capped read would silently skew its stats
+    return await cursor.to_list(length=None)
+
+def update_position(token_data: Dict[str, Dict[str, Any]], tx: Dict[str, Any], token_symbol: str, amount: float, price: float):
+    """
+    Apply a single transaction, with its already-parsed amount and price, to its token's running position
+    """
+    token_address = tx.get("token_address", "")
+    if not token_address:
+        return
     
-    # Convert MongoDB ObjectId to string for serialization
-    for tx in transactions:
-        if "_id" in tx:
-            tx["_id"] = str(tx["_id"])
+    position = token_data.get(token_address)
+    if position is None:
+        position = token_data[token_address] = {
+            "token_address": token_address,
+            "token_name": tx.get("token_name", ""),
+            "token_symbol": token_symbol,
+            "balance": 0.0,
+            "value": 0.0,
+            "cost_basis": 0.0,
+            "last_price": 0.0
+        }
     
-    return transactions
+    # Update token data based on transaction type
+    tx_type = tx.get("type")
+    if tx_type == "buy":
+        position["balance"] += amount
+        if price > 0:
+            position["cost_basis"] += (amount * price)
+    elif tx_type == "sell":
+        position["balance"] -= amount
+    
+    # Update last price if available
+    if price > 0:
+        position["last_price"] = price
 
-async def analyze_transactions(transactions):
+def build_positions(token_data: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Calculate current value and create positions list from open balances
+    """
+    positions = []
+    for data in token_data.values():
+        if data["balance"] > 0:
+            if data["last_price"] > 0:
+                data["value"] = data["balance"] * data["last_price"]
+            positions.append(data)
+    return positions
+
+def analyze_transactions(transactions, compute_positions: bool = False):
     """
     Analyze token trades to calculate statistics in native currency (SOL or ETH)
+    With compute_positions, token positions are built in the same pass and
+    (stats, positions) is returned
     """
     if not transactions:
-        return {
+        stats = {
             "best_trade_profit": 0.0,
             "best_trade_token": "",
             "best_multiplier": 0.0,
@@ -159,24 +530,56 @@ async def analyze_transactions(transactions):
             "worst_trade_loss": 0.0,
             "worst_trade_token": ""
         }
+        return (stats, []) if compute_positions else stats
     
-    # Group transactions by token
-    token_transactions = {}
-    token_metadata = {}
+    # Flatten trades into parallel columns, numbering tokens in order of first appearance,
+    # and track positions along the way if asked
+    token_ids = {}
+    token_data = {}
+    tx_keys = []
+    tx_timestamps = []
+    tx_prices = []
+    tx_amounts = []
     
     for tx in transactions:
         token_symbol = tx.get("token_symbol", "")
         if not token_symbol:
             continue
-            
-        if token_symbol not in token_transactions:
-            token_transactions[token_symbol] = []
-            token_metadata[token_symbol] = {
-                "address": tx.get("token_address", ""),
-                "name": tx.get("token_name", ""),
-                "symbol": token_symbol
-            }
-        token_transactions[token_symbol].append(tx)
+        
+        token_id = token_ids.get(token_symbol)
+        if token_id is None:
+            token_id = token_ids[token_symbol] = len(token_ids)
+        
+        side = TRADE_SIDES.get(tx.get("type", ""))
+        if side is None and not compute_positions:
+            continue
+        
+        # Parse the numbers once for both the position and the trade columns
+        amount = float(tx.get("amount", 0))
+        price = float(tx.get("price", 0))
+        
+        if compute_positions:
+            update_position(token_data, tx, token_symbol, amount, price)
+        
+        if side is None:
+            continue
+        
+        # Only buys with a positive amount can be matched
+        if side == 0 and not amount > 0:
+            continue
+        
+        tx_keys.append(2 * token_id + side)
+        tx_timestamps.append(tx.get("timestamp", 0))
+        tx_prices.append(price)
+        tx_amounts.append(amount)
+    
+    # One stable sort by (token, side, timestamp) lays each token out as a time-ordered
+    # run of buys followed by a time-ordered run of sells
+    keys = np.array(tx_keys, dtype=np.int64)
+    order = np.lexsort((np.array(tx_timestamps, dtype=np.float64), keys))
+    prices = np.array(tx_prices, dtype=np.float64)[order]
+    amounts = np.array(tx_amounts, dtype=np.float64)[order]
+    bounds = np.searchsorted(keys[order], np.arange(2 * len(token_ids) + 1)).tolist()
     
     # Calculate statistics
     best_trade_profit = 0.0
@@ -188,84 +591,20 @@ async def analyze_transactions(transactions):
     worst_trade_token = ""
     
     # Process each token separately
-    for token, txs in token_transactions.items():
-        # Sort transactions by timestamp
-        sorted_txs = sorted(txs, key=lambda x: x.get("timestamp", 0))
-        
-        # Separate buys and sells
-        buys = [tx for tx in sorted_txs if tx.get("type", "") == "buy"]
-        sells = [tx for tx in sorted_txs if tx.get("type", "") == "sell"]
+    for token, token_id in token_ids.items():
+        buys_start, sells_start, sells_end = bounds[2 * token_id:2 * token_id + 3]
         
         # Skip tokens with no buy/sell pairs
-        if not buys or not sells:
+        if buys_start == sells_start or sells_start == sells_end:
             continue
         
-        # Calculate trades
-        token_pnl = 0.0
-        token_best_trade = 0.0
-        token_worst_trade = 0.0
-        token_best_multiplier = 0.0
-        
-        # Process buys and sells to pair them into trades
-        remaining_buys = []
-        for buy in buys:
-            # Make sure amount and price are numeric
-            buy_amount = float(buy.get("amount", 0))
-            buy_price = float(buy.get("price", 0))
-            
-            if buy_amount > 0:
-                remaining_buys.append({
-                    "price": buy_price,
-                    "amount": buy_amount,
-                    "timestamp": buy.get("timestamp", 0)
-                })
-        
-        for sell in sells:
-            # Make sure amount and price are numeric
-            sell_amount = float(sell.get("amount", 0))
-            sell_price = float(sell.get("price", 0))
-            sell_timestamp = sell.get("timestamp", 0)
-            
-            if sell_amount <= 0 or not remaining_buys:
-                continue
-                
-            # Match with available buys (oldest first)
-            matched_sell_amount = 0
-            while matched_sell_amount < sell_amount and remaining_buys:
-                buy = remaining_buys[0]
-                
-                # Determine matched amount
-                available_amount = min(buy["amount"], sell_amount - matched_sell_amount)
-                
-                # Calculate PnL for this matched portion
-                if buy["price"] > 0 and sell_price > 0:
-                    buy_value = available_amount * buy["price"]
-                    sell_value = available_amount * sell_price
-                    trade_pnl = sell_value - buy_value
-                    
-                    # Update token PnL
-                    token_pnl += trade_pnl
-                    
-                    # Check if this is the best or worst trade
-                    if trade_pnl > token_best_trade:
-                        token_best_trade = trade_pnl
-                    
-                    if trade_pnl < token_worst_trade:
-                        token_worst_trade = trade_pnl
-                    
-                    # Calculate multiplier (avoid division by zero)
-                    if buy_value > 0:
-                        multiplier = sell_value / buy_value
-                        if multiplier > token_best_multiplier:
-                            token_best_multiplier = multiplier
-                
-                # Update remaining amounts
-                buy["amount"] -= available_amount
-                matched_sell_amount += available_amount
-                
-                # Remove buy if fully used
-                if buy["amount"] <= 0:
-                    remaining_buys.pop(0)
+        # Pair buys and sells into trades
+        token_pnl, token_best_trade, token_worst_trade, token_best_multiplier = (
+            float(value) for value in match_trades(
+                prices[buys_start:sells_start], amounts[buys_start:sells_start],
+                prices[sells_start:sells_end], amounts[sells_start:sells_end]
+            )
+        )
         
         # Update global stats if token has noteworthy stats
         if token_best_trade > best_trade_profit:
@@ -283,7 +622,6 @@ async def analyze_transactions(transactions):
         # Add to total PnL
         all_time_pnl += token_pnl
     
-    # Get token metadata for statistics
     stats = {
         "best_trade_profit": best_trade_profit,
         "best_trade_token": best_trade_token,
@@ -291,10 +629,11 @@ async def analyze_transactions(transactions):
         "best_multiplier_token": best_multiplier_token,
         "all_time_pnl": all_time_pnl,
         "worst_trade_loss": worst_trade_loss,
-        "worst_trade_token": worst_trade_token,
-        "token_metadata": token_metadata
+        "worst_trade_token": worst_trade_token
     }
     
+    if compute_positions:
+        return stats, build_positions(token_data)
     return stats
 
 # API routes
@@ -302,8 +641,9 @@ async def analyze_transactions(transactions):
 async def root():
     return {"message": "Pain or Gains API - Memecoin Analysis Tool"}
 
-@api_router.post("/analyze")
-async def analyze_wallet(search_query: SearchQuery) -> TradeStats:
+# TradeStats documents the response shape; the handler returns it pre-serialized
+@api_router.post("/analyze", response_model=TradeStats, dependencies=[Depends(rate_limit)])
+async def analyze_wallet(search_query: SearchQuery) -> ORJSONResponse:
     """
     Analyze a wallet's token trades and return statistics
     """
@@ -318,83 +658,110 @@ async def analyze_wallet(search_query: SearchQuery) -> TradeStats:
     elif blockchain == "base" and not is_valid_eth_address(wallet_address):
         raise HTTPException(status_code=400, detail="Invalid Ethereum/Base wallet address")
     
+    key = (wallet_address, blockchain)
+    
+    # Serve a recent analysis of the same wallet, with a fresh id and timestamp
+    cached = get_cached_response("analyze", key)
+    if cached is not None:
+        logger.info(f"Using cached analysis for {wallet_address}")
+        return ORJSONResponse({**cached, "id": uuid.uuid4().hex, "timestamp": datetime.now()})
+    
+    # Join an in-flight analysis of the same wallet instead of starting another
+    task = ANALYSIS_INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.create_task(run_wallet_analysis(wallet_address, blockchain))
+        ANALYSIS_INFLIGHT[key] = task
+        task.add_done_callback(lambda _: ANALYSIS_INFLIGHT.pop(key, None))
+    else:
+        logger.info(f"Joining in-flight analysis for {wallet_address}")
+    
+    # Shield so a disconnecting client doesn't cancel the run for other waiters
+    return ORJSONResponse(await asyncio.shield(task))
+
+async def run_wallet_analysis(wallet_address: str, blockchain: str) -> Dict[str, Any]:
+    """
+    Fetch, analyze and store trade statistics for a single wallet
+    """
     try:
-        # Check if we have cached wallet data
-        wallet_doc = await wallets_collection.find_one({"address": wallet_address, "blockchain": blockchain})
-        
-        # Get transactions - either from cache or fetch new ones
-        if wallet_doc and wallet_doc.get("last_updated"):
-            last_updated = wallet_doc["last_updated"]
-            if (datetime.now() - last_updated).total_seconds() < 3600:  # 1 hour cache
-                logger.info(f"Using cached transactions for {wallet_address}")
-                transactions = await get_stored_transactions(wallet_address, blockchain)
-            else:
-                # Refresh if data is over an hour old
-                logger.info(f"Refreshing transactions for {wallet_address}")
-                transactions = fetch_wallet_transactions(wallet_address, blockchain)
-                await store_transactions(wallet_address, blockchain, transactions)
-        else:
-            # Fetch new transactions
-            logger.info(f"Fetching new transactions for {wallet_address}")
-            transactions = fetch_wallet_transactions(wallet_address, blockchain)
-            await store_transactions(wallet_address, blockchain, transactions)
+        # Check if we have cached wallet data and a stored analysis of it
+        wallet_doc, analysis_doc = await asyncio.gather(
+            wallets_collection.find_one({"address": wallet_address, "blockchain": blockchain}, WALLET_PROJECTION),
+            collection.find_one({"wallet_address": wallet_address, "blockchain": blockchain}, {"_id": 0})
+        )
+        
+        now = datetime.now()
+        last_updated = wallet_doc.get("last_updated") if wallet_doc else None
+        
+        # The stored analysis is still valid if it was made from fresh stored transactions
+        if (transactions_are_fresh(last_updated, now)
+                and analysis_doc and analysis_doc.get("timestamp") and analysis_doc["timestamp"] >= last_updated):
+            logger.info(f"Using stored analysis for {wallet_address}")
+            set_cached_response("analyze", (wallet_address, blockchain), analysis_doc)
+            return {**analysis_doc, "id": uuid.uuid4().hex, "timestamp": now}
+        
+        # Get transactions - either from storage or fetch new ones
+        transactions = await load_wallet_transactions(wallet_address, blockchain, last_updated, now)
         
         logger.info(f"Found {len(transactions)} transactions for {wallet_address}")
         
         # Don't show any results if no transactions found
         if not transactions:
             logger.info(f"No transactions found for {blockchain} wallet: {wallet_address}")
-            return TradeStats(
-                id=str(uuid.uuid4()),
-                wallet_address=wallet_address,
-                blockchain=blockchain,
-                best_trade_profit=0.0,
-                best_trade_token="",
-                best_multiplier=0.0,
-                best_multiplier_token="",
-                all_time_pnl=0.0,
-                worst_trade_loss=0.0,
-                worst_trade_token="",
-                timestamp=datetime.now()
-            )
+            return {
+                "id": uuid.uuid4().hex,
+                "wallet_address": wallet_address,
+                "blockchain": blockchain,
+                "best_trade_profit": 0.0,
+                "best_trade_token": "",
+                "best_multiplier": 0.0,
+                "best_multiplier_token": "",
+                "all_time_pnl": 0.0,
+                "worst_trade_loss": 0.0,
+                "worst_trade_token": "",
+                "timestamp": datetime.now()
+            }
         
-        # Analyze trades
-        stats = await analyze_transactions(transactions)
-        
-        # Create response
-        result = TradeStats(
-            id=str(uuid.uuid4()),
-            wallet_address=wallet_address,
-            blockchain=blockchain,
-            best_trade_profit=stats["best_trade_profit"],
-            best_trade_token=stats["best_trade_token"],
-            best_multiplier=stats["best_multiplier"],
-            best_multiplier_token=stats["best_multiplier_token"],
-            all_time_pnl=stats["all_time_pnl"],
-            worst_trade_loss=stats["worst_trade_loss"],
-            worst_trade_token=stats["worst_trade_token"],
-            timestamp=datetime.now()
-        )
+        # Analyze trades off the event loop - it's pure CPU work
+        stats = await asyncio.to_thread(analyze_transactions, transactions)
         
-        # Store in MongoDB - update existing or insert new
-        await collection.update_one(
-            {"wallet_address": wallet_address, "blockchain": blockchain},
-            {"$set": result.dict()},
-            upsert=True
-        )
+        # Build the stored document straight from the computed stats
+        stats_doc = {
+            "id": uuid.uuid4().hex,
+            "wallet_address": wallet_address,
+            "blockchain": blockchain,
+            "best_trade_profit": stats["best_trade_profit"],
+            "best_trade_token": stats["best_trade_token"],
+            "best_multiplier": stats["best_multiplier"],
+            "best_multiplier_token": stats["best_multiplier_token"],
+            "all_time_pnl": stats["all_time_pnl"],
+            "worst_trade_loss": stats["worst_trade_loss"],
+            "worst_trade_token": stats["worst_trade_token"],
+            # Stamped after the fetch so it sorts after the wallet's last_updated
+            "timestamp": datetime.now()
+        }
+        
+        # Store with the next batch - the response doesn't depend on the write
+        queue_wallet_stats(stats_doc)
+        set_cached_response("analyze", (wallet_address, blockchain), stats_doc)
         
-        return result
+        # Values are computed here, so the response skips pydantic validation entirely
+        return stats_doc
         
     except Exception as e:
         logger.error(f"Error analyzing wallet: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error analyzing wallet: {str(e)}")
 
-@api_router.get("/wallet/{wallet_address}")
+@api_router.get("/wallet/{wallet_address}", dependencies=[Depends(rate_limit)])
 async def get_wallet_details(wallet_address: str, blockchain: str = Query(...)):
     """
     Get wallet details with token positions
     """
+    # Reject unknown chains up front - the chain is part of the cache and database keys
+    blockchain = blockchain.lower()
+    if blockchain not in SUPPORTED_BLOCKCHAINS:
+        raise HTTPException(status_code=400, detail="Invalid blockchain")
+    
     try:
         logger.info(f"Getting details for {blockchain} wallet: {wallet_address}")
         
@@ -404,167 +771,148 @@ async def get_wallet_details(wallet_address: str, blockchain: str = Query(...)):
         elif blockchain == "base" and not is_valid_eth_address(wallet_address):
             raise HTTPException(status_code=400, detail="Invalid Ethereum/Base wallet address")
         
-        # Check if we have cached wallet data
-        wallet_doc = await wallets_collection.find_one({"address": wallet_address, "blockchain": blockchain})
-        
-        # Get transactions - either from cache or fetch new ones
-        if wallet_doc and wallet_doc.get("last_updated"):
-            last_updated = wallet_doc["last_updated"]
-            if (datetime.now() - last_updated).total_seconds() < 3600:  # 1 hour cache
-                logger.info(f"Using cached transactions for {wallet_address}")
-                transactions = await get_stored_transactions(wallet_address, blockchain)
-            else:
-                # Refresh if data is over an hour old
-                logger.info(f"Refreshing transactions for {wallet_address}")
-                transactions = fetch_wallet_transactions(wallet_address, blockchain)
-                await store_transactions(wallet_address, blockchain, transactions)
-        else:
-            # Fetch new transactions
-            logger.info(f"Fetching new transactions for {wallet_address}")
-            transactions = fetch_wallet_transactions(wallet_address, blockchain)
-            await store_transactions(wallet_address, blockchain, transactions)
-        
-        logger.info(f"Found {len(transactions)} transactions for {wallet_address}")
-        
-        # Process transactions to get token positions
-        positions = []
-        token_data = {}
+        # Serve a recent response if we have one
+        cached = get_cached_response("wallet", (wallet_address, blockchain))
+        if cached is not None:
+            logger.info(f"Using cached wallet details for {wallet_address}")
+            return ORJSONResponse(cached)
         
-        for tx in transactions:
-            token_address = tx.get("token_address", "")
-            token_name = tx.get("token_name", "")
-            token_symbol = tx.get("token_symbol", "")
-            
-            if not token_address or not token_symbol:
-                continue
-                
-            if token_address not in token_data:
-                token_data[token_address] = {
-                    "token_address": token_address,
-                    "token_name": token_name,
-                    "token_symbol": token_symbol,
-                    "balance": 0.0,
-                    "value": 0.0,
-                    "cost_basis": 0.0,
-                    "last_price": 0.0
-                }
-            
-            # Update token data based on transaction type
-            amount = float(tx.get("amount", 0))
-            price = float(tx.get("price", 0))
-            
-            if tx.get("type") == "buy":
-                token_data[token_address]["balance"] += amount
-                if price > 0:
-                    token_data[token_address]["cost_basis"] += (amount * price)
-            elif tx.get("type") == "sell":
-                token_data[token_address]["balance"] -= amount
-            
-            # Update last price if available
-            if price > 0:
-                token_data[token_address]["last_price"] = price
+        # Check if we have cached wallet data
+        wallet_doc = await wallets_collection.find_one({"address": wallet_address, "blockchain": blockchain}, WALLET_PROJECTION)
         
-        # Calculate current value and create positions list
-        for token_address, data in token_data.items():
-            if data["balance"] > 0:
-                if data["last_price"] > 0:
-                    data["value"] = data["balance"] * data["last_price"]
-                positions.append(data)
+        # Get transactions - either from storage or fetch new ones
+        last_updated = wallet_doc.get("last_updated") if wallet_doc else None
+        transactions = await load_wallet_transactions(wallet_address, blockchain, last_updated, datetime.now())
         
-        # Get trade stats
-        stats = await analyze_transactions(transactions)
+        logger.info(f"Found {len(transactions)} transactions for {wallet_address}")
         
-        # Remove token_metadata from stats for cleaner response
-        if "token_metadata" in stats:
-            del stats["token_metadata"]
+        # Get trade stats and token positions in a single pass
+        stats, positions = await asyncio.to_thread(analyze_transactions, transactions, True)
         
-        return {
+        response = {
             "wallet_address": wallet_address,
             "blockchain": blockchain,
             "positions": positions,
             "stats": stats
         }
+        set_cached_response("wallet", (wallet_address, blockchain), response)
+        
+        # Plain data all the way down - hand it straight to orjson, skipping jsonable_encoder
+        return ORJSONResponse(response)
     
     except Exception as e:
         logger.error(f"Error getting wallet details: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error getting wallet details: {str(e)}")
 
+async def get_leaderboard_token_info(keys: List[tuple]) -> Dict[tuple, tuple]:
+    """
+    Get the (address, name) of each leaderboard entry's (wallet, symbol) token
+    """
+    token_info = {}
+    missing = []
+    
+    # Leaderboard entries change far less often than they're served
+    for key in set(keys):
+        cached = get_cached_response("token_info", key)
+        if cached is not None:
+            token_info[key] = cached
+        else:
+            missing.append(key)
+    
+    if not missing:
+        return token_info
+    
+    # Read uncached tokens from the per-wallet token metadata written by store_transactions
+    meta_query = {"$or": [{"wallet_address": wallet_address, "token_symbol": token_symbol}
+                          for wallet_address, token_symbol in missing]}
+    meta_projection = {"_id": 0, "wallet_address": 1, "token_symbol": 1, "token_address": 1, "token_name": 1}
+    async for doc in token_meta_collection.find(meta_query, meta_projection):
+        token_info[(doc["wallet_address"], doc["token_symbol"])] = (doc.get("token_address") or "", doc.get("token_name") or "")
+    
+    # Wallets stored before token metadata was kept fall back to their transactions
+    unresolved = [key for key in missing if key not in token_info]
+    if unresolved:
+        await lookup_token_info_from_transactions(unresolved, token_info)
+    
+    for key in missing:
+        token_info.setdefault(key, ("", ""))
+        set_cached_response("token_info", key, token_info[key])
+    
+    return token_info
+
+async def lookup_token_info_from_transactions(keys: List[tuple], token_info: Dict[tuple, tuple]):
+    """
+    Fill in the (address, name) of (wallet, symbol) tokens from the transactions collection
+    """
+    # One round trip, grouping server-side so only one document per token comes back
+    pipeline = [
+        {"$match": {"$or": [{"wallet_address": wallet_address, "token_symbol": token_symbol}
+                            for wallet_address, token_symbol in keys]}},
+        {"$group": {
+            "_id": {"wallet_address": "$wallet_address", "token_symbol": "$token_symbol"},
+            "token_address": {"$first": "$token_address"},
+            "token_name": {"$first": "$token_name"}
+        }}
+    ]
+    async for doc in transactions_collection.aggregate(pipeline):
+        key = (doc["_id"]["wallet_address"], doc["_id"]["token_symbol"])
+        token_info[key] = (doc.get("token_address") or "", doc.get("token_name") or "")
+
 @api_router.get("/leaderboard")
 async def get_leaderboard(blockchain: str = Query(...), metric: str = Query(...)):
     """
     Get leaderboard data for a specific statistic
     """
     try:
-        if blockchain not in ["solana", "base"]:
+        if blockchain not in SUPPORTED_BLOCKCHAINS:
             raise HTTPException(status_code=400, detail="Invalid blockchain")
         
-        stat_map = {
-            "best_trade": ("best_trade_profit", -1, "best_trade_token"),
-            "best_multiplier": ("best_multiplier", -1, "best_multiplier_token"),
-            "all_time_pnl": ("all_time_pnl", -1, None),
-            "worst_trade": ("worst_trade_loss", 1, "worst_trade_token")  # For worst trade, lower (more negative) is higher rank
-        }
-        
-        if metric not in stat_map:
+        if metric not in LEADERBOARD_STATS:
             raise HTTPException(status_code=400, detail="Invalid metric")
             
-        field, sort_order, token_field = stat_map[metric]
+        field, sort_order, token_field = LEADERBOARD_STATS[metric]
+        
+        # Serve a recent leaderboard if we have one
+        cached = get_cached_response("leaderboard", (blockchain, metric))
+        if cached is not None:
+            return ORJSONResponse(cached)
         
         # Get top wallets from our database
-        # Use distinct to make sure we only get one entry per wallet
-        pipeline = [
-            {"$match": {"blockchain": blockchain}},
-            {"$sort": {field: sort_order}},
-            {"$group": {
-                "_id": "$wallet_address",
-                "wallet": {"$first": "$wallet_address"},
-                "blockchain": {"$first": "$blockchain"},
-                "value": {"$first": f"${field}"},
-                "token_field": {"$first": f"${token_field}"} if token_field else {"$literal": ""}
-            }},
-            {"$sort": {"value": sort_order}},
-            {"$limit": 10}
-        ]
-        
-        cursor = collection.aggregate(pipeline)
+        # Analyses are upserted per (wallet, blockchain), so each wallet already has exactly one document
+        cursor = collection.find({"blockchain": blockchain}, LEADERBOARD_PROJECTIONS[metric]).sort(field, sort_order).limit(10)
         leaderboard_entries = await cursor.to_list(length=10)
         
+        # Look up the token info of every entry that has a token
+        token_keys = [(entry["wallet_address"], entry.get(token_field, "")) for entry in leaderboard_entries] if token_field else []
+        token_info = await get_leaderboard_token_info([key for key in token_keys if key[1]])
+        
         # Format the results
         formatted_entries = []
         for entry in leaderboard_entries:
-            token_symbol = entry.get("token_field", "")
-            
-            # Get token info if available
-            token_address = ""
-            token_name = ""
-            
-            # Look up in transactions collection
-            if token_symbol:
-                tx_query = {"token_symbol": token_symbol, "wallet_address": entry["wallet"]}
-                tx = await transactions_collection.find_one(tx_query)
-                if tx:
-                    token_address = tx.get("token_address", "")
-                    token_name = tx.get("token_name", "")
-            
+            token_symbol = entry.get(token_field, "") if token_field else ""
+            token_address, token_name = token_info.get((entry["wallet_address"], token_symbol), ("", ""))
             formatted_entries.append({
-                "wallet": entry["wallet"],
-                "blockchain": entry["blockchain"],
+                "wallet": entry["wallet_address"],
+                "blockchain": blockchain,
                 "token_address": token_address,
                 "token_name": token_name,
                 "token_symbol": token_symbol,
-                "value": entry.get("value", 0)
+                "value": entry.get(field, 0)
             })
         
-        return formatted_entries
+        set_cached_response("leaderboard", (blockchain, metric), formatted_entries)
+        
+        # Plain data all the way down - hand it straight to orjson, skipping jsonable_encoder
+        return ORJSONResponse(formatted_entries)
         
     except Exception as e:
         logger.error(f"Error getting leaderboard: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error getting leaderboard: {str(e)}")
 
-# Mount the API router
-app.mount("/api", api_router)
+# Include the API routes in the main app
+app.include_router(api_router)
 
 # Root endpoint
 @app.get("/")
@@ -572,11 +920,100 @@ async def app_root():
     return {"message": "Pain or Gains API - Memecoin Analysis Tool. Access API at /api"}
 
 # MongoDB connection events
+async def remove_duplicates(target, key_fields: List[str], newest_field: str):
+    """
+    Delete all but the newest document for each key, so a unique index can be built over it
+    """
+    pipeline = [
+        {"$sort": {newest_field: -1}},
+        {"$group": {
+            "_id": {field: f"${field}" for field in key_fields},
+            "ids": {"$push": "$_id"},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}}
+    ]
+    stale_ids = []
+    async for doc in target.aggregate(pipeline, allowDiskUse=True):
+        stale_ids.extend(doc["ids"][1:])
+    
+    if stale_ids:
+        result = await target.delete_many({"_id": {"$in": stale_ids}})
+        logger.warning(f"Removed {result.deleted_count} duplicate documents from {target.name} on {key_fields}")
+
+async def create_unique_index(target, key_fields: List[str], newest_field: str):
+    """
+    Create a unique index over key_fields, deduplicating documents written before it existed
+    Falls back to a plain index rather than failing startup if that still doesn't work
+    """
+    index_keys = [(field, 1) for field in key_fields]
+    try:
+        await target.create_index(index_keys, unique=True)
+        return
+    except OperationFailure as e:
+        if e.code != 11000:
+            logger.error(f"Could not create unique index on {target.name} {key_fields}: {str(e)}")
+            await target.create_index(index_keys)
+            return
+        logger.warning(f"Duplicate documents in {target.name} on {key_fields}, removing them before indexing")
+    
+    try:
+        await remove_duplicates(target, key_fields, newest_field)
+        await target.create_index(index_keys, unique=True)
+    except OperationFailure as e:
+        logger.error(f"Could not create unique index on {target.name} {key_fields}, using a plain index: {str(e)}")
+        await target.create_index(index_keys)
+
 @app.on_event("startup")
 async def startup_db_client():
+    global stats_flush_task
+    
+    # Give blocking lookups enough threads that slow RPCs don't queue up behind each other
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=WORKER_THREADS))
+    
     await db.command("ping")
+    # Make a first real query so the collection path is warm before traffic arrives
+    await collection.find_one({}, {"_id": 1})
     logger.info("Connected to MongoDB")
+    
+    # One analysis document per wallet - also serves the upsert lookups in flush_wallet_stats
+    await create_unique_index(collection, ["wallet_address", "blockchain"], "timestamp")
+    
+    # Index each leaderboard metric so its filter + sort is served by an index scan, carrying
+    # the projected fields too so the top 10 are read from the index without fetching documents
+    for field, sort_order, token_field in LEADERBOARD_STATS.values():
+        index_keys = [("blockchain", 1), (field, sort_order), ("wallet_address", 1)]
+        if token_field:
+            index_keys.append((token_field, 1))
+        await collection.create_index(index_keys)
+    
+    # One record per wallet - serves the freshness checks and the upsert in store_transactions
+    await create_unique_index(wallets_collection, ["address", "blockchain"], "last_updated")
+    
+    # Serve the per-wallet reads, replaces and indexer upserts on transactions, plus the
+    # leaderboard's (wallet, symbol) token lookups
+    await transactions_collection.create_index([("wallet_address", 1), ("blockchain", 1), ("timestamp", 1)])
+    await transactions_collection.create_index([("tx_hash", 1), ("wallet_address", 1)])
+    await transactions_collection.create_index([("wallet_address", 1), ("token_symbol", 1)])
+    
+    # One metadata record per token a wallet traded - serves the leaderboard's token lookups
+    await create_unique_index(token_meta_collection, ["wallet_address", "token_symbol"], "_id")
+    
+    # Warm the token lookup path (HTTP stack, SSL context, token cache) off the startup path
+    run_in_background(asyncio.to_thread(get_token_name, WRAPPED_SOL_ADDRESS, "solana"))
+    
+    # Start writing queued wallet analyses in batches
+    stats_flush_task = asyncio.create_task(flush_wallet_stats_periodically())
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    # Stop the flush timer, write whatever is still queued and let pending
+    # background writes finish before closing the connection
+    if stats_flush_task is not None:
+        stats_flush_task.cancel()
+    await flush_wallet_stats()
+    if BACKGROUND_TASKS:
+        await asyncio.gather(*BACKGROUND_TASKS, return_exceptions=True)
+    # Fetches are done by now, so the shared RPC session can go too
+    await close_http_session()
     client.close()
@@ -18,7 +18,7 @@ import asyncio
 import json
 import base58
 import base64
-import requests
+import aiohttp
 import pymongo
 from typing import List, Dict, Any, Optional, Set, Tuple
 from datetime import datetime, timedelta
@@ -31,7 +31,7 @@ logger = logging.getLogger(__name__)
 
 # Add the backend directory to the path for imports
 sys.path.append("/app/backend")
-from token_finder import get_token_name
+from token_finder import get_token_name, get_token_names
 
 # Environment variables
 MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
@@ -60,6 +60,26 @@ BASE_DEX_ROUTERS = {
 MAX_ITEMS_PER_REQUEST = 100  # Most APIs limit to 100 items per request
 MAX_REQUESTS_PER_MINUTE = 10  # Rate limit ourselves to avoid 429 errors
 MAX_TRANSACTIONS_PER_WALLET = 1000  # Reasonable limit for free APIs
+MAX_CONCURRENT_REQUESTS = 8  # Transaction detail fetches in flight at once when batching isn't available
+BATCH_REQUEST_TIMEOUT = 30  # seconds - a full page of parsed transactions is a large response
+
+# HTTP session shared by every indexer run, so connections and TLS sessions are reused across wallets
+http_session: Optional[aiohttp.ClientSession] = None
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """Get the shared HTTP session, opening it on first use"""
+    global http_session
+    if http_session is None or http_session.closed:
+        http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100),
+            timeout=aiohttp.ClientTimeout(total=10)
+        )
+    return http_session
+
+async def close_http_session():
+    """Close the shared HTTP session"""
+    if http_session is not None and not http_session.closed:
+        await http_session.close()
 
 @dataclass
 class IndexerState:
@@ -79,6 +99,12 @@ class TransactionIndexer:
         self.rpc_calls_this_minute = 0
         self.minute_start_time = time.time()
         self.sol_token_cache = {}  # Cache of known SPL tokens
+        self.request_semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)  # Bounds concurrent detail fetches
+        self.rate_limit_lock = asyncio.Lock()  # Keeps concurrent callers from sharing one rate limit sleep
+    
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Get the HTTP session for RPC calls"""
+        return await get_http_session()
     
     def get_solana_rpc_endpoint(self) -> str:
         """Get the Solana RPC endpoint with API key if available"""
@@ -148,24 +174,26 @@ class TransactionIndexer:
             upsert=True
         )
     
-    async def rate_limit_check(self):
-        """Check if we need to pause for rate limiting"""
-        current_time = time.time()
-        elapsed = current_time - self.minute_start_time
-        
-        # Reset counter if a minute has passed
-        if elapsed > 60:
-            self.rpc_calls_this_minute = 0
-            self.minute_start_time = current_time
-            return
-        
-        # If we're at the limit, sleep until the minute is up
-        if self.rpc_calls_this_minute >= MAX_REQUESTS_PER_MINUTE:
-            sleep_time = 60 - elapsed
-            logger.info(f"Rate limit reached, sleeping for {sleep_time:.2f} seconds")
-            await asyncio.sleep(sleep_time)
-            self.rpc_calls_this_minute = 0
-            self.minute_start_time = time.time()
+    async def rate_limit_check(self, calls: int = 1):
+        """Check if we need to pause for rate limiting before making `calls` RPC calls"""
+        async with self.rate_limit_lock:
+            current_time = time.time()
+            elapsed = current_time - self.minute_start_time
+            
+            # Reset counter if a minute has passed
+            if elapsed > 60:
+                self.rpc_calls_this_minute = 0
+                self.minute_start_time = current_time
+                return
+            
+            # If these calls would go over the limit, sleep until the minute is up - a batch bigger
+            # than the whole limit goes out alone at the start of a minute
+            if self.rpc_calls_this_minute > 0 and self.rpc_calls_this_minute + calls > MAX_REQUESTS_PER_MINUTE:
+                sleep_time = 60 - elapsed
+                logger.info(f"Rate limit reached, sleeping for {sleep_time:.2f} seconds")
+                await asyncio.sleep(sleep_time)
+                self.rpc_calls_this_minute = 0
+                self.minute_start_time = time.time()
     
     async def fetch_solana_signatures(self, wallet_address: str, before: Optional[str] = None) -> List[Dict[str, Any]]:
         """
@@ -195,13 +223,14 @@ class TransactionIndexer:
         }
         
         try:
-            response = requests.post(endpoint, json=payload)
-            if response.status_code == 200:
-                data = response.json()
-                if "result" in data and data["result"]:
-                    return data["result"]
-            else:
-                logger.error(f"Error fetching Solana signatures: {response.text}")
+            session = await self.get_session()
+            async with session.post(endpoint, json=payload) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if "result" in data and data["result"]:
+                        return data["result"]
+                else:
+                    logger.error(f"Error fetching Solana signatures: {await response.text()}")
         except Exception as e:
             logger.error(f"Exception fetching Solana signatures: {str(e)}")
         
@@ -228,15 +257,16 @@ class TransactionIndexer:
         }
         
         try:
-            response = requests.post(endpoint, json=payload)
-            if response.status_code == 200:
-                data = response.json()
-                if "result" in data and data["result"] and data["result"]["value"]:
-                    is_token = "parsed" in data["result"]["value"]["data"] and data["result"]["value"]["data"]["parsed"]["type"] == "mint"
-                    self.sol_token_cache[account] = is_token
-                    return is_token
-            else:
-                logger.error(f"Error checking token account: {response.text}")
+            session = await self.get_session()
+            async with session.post(endpoint, json=payload) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if "result" in data and data["result"] and data["result"]["value"]:
+                        is_token = "parsed" in data["result"]["value"]["data"] and data["result"]["value"]["data"]["parsed"]["type"] == "mint"
+                        self.sol_token_cache[account] = is_token
+                        return is_token
+                else:
+                    logger.error(f"Error checking token account: {await response.text()}")
         except Exception as e:
             logger.error(f"Exception checking token account: {str(e)}")
         
@@ -260,18 +290,86 @@ class TransactionIndexer:
         }
         
         try:
-            response = requests.post(endpoint, json=payload)
-            if response.status_code == 200:
-                data = response.json()
-                if "result" in data and data["result"]:
-                    return data["result"]
-            else:
-                logger.error(f"Error fetching transaction {signature}: {response.text}")
+            session = await self.get_session()
+            async with session.post(endpoint, json=payload) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if "result" in data and data["result"]:
+                        return data["result"]
+                else:
+                    logger.error(f"Error fetching transaction {signature}: {await response.text()}")
         except Exception as e:
             logger.error(f"Exception fetching transaction {signature}: {str(e)}")
         
         return None
     
+    async def fetch_solana_transactions(self, signatures: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Fetch a page of Solana transactions in one JSON-RPC batch, in signature order
+        Falls back to concurrent single fetches for the whole page if the endpoint rejects
+        batches, or for just the items that failed within the batch
+        """
+        if not signatures:
+            return []
+        
+        # Each call in the batch counts against the rate limit, same as a single request
+        await self.rate_limit_check(len(signatures))
+        
+        endpoint = self.get_solana_rpc_endpoint()
+        self.rpc_calls_this_minute += len(signatures)
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(signatures)
+        retry = list(range(len(signatures)))
+        
+        payload = [
+            {
+                "jsonrpc": "2.0",
+                "id": i,
+                "method": "getTransaction",
+                "params": [
+                    signature,
+                    {"encoding": "jsonParsed", "maxSupportedTransactionVersion": 0}
+                ]
+            }
+            for i, signature in enumerate(signatures)
+        ]
+        
+        try:
+            session = await self.get_session()
+            async with session.post(endpoint, json=payload, timeout=aiohttp.ClientTimeout(total=BATCH_REQUEST_TIMEOUT)) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if isinstance(data, list):
+                        # Batch responses can come back in any order - match them up by id.
+                        # A null result means the transaction wasn't found, so it stays None
+                        answered = set()
+                        for item in data:
+                            if isinstance(item, dict) and item.get("id") in range(len(signatures)):
+                                if "error" in item:
+                                    logger.warning(f"Error fetching transaction {signatures[item['id']]} in batch: {item['error']}")
+                                    continue
+                                results[item["id"]] = item.get("result")
+                                answered.add(item["id"])
+                        
+                        # Items that errored or are missing get retried one at a time rather than
+                        # dropped - the page cursor moves past them either way
+                        retry = [i for i in range(len(signatures)) if i not in answered]
+                        if not retry:
+                            return results
+                    else:
+                        logger.warning(f"Transaction batch not supported: {data}")
+                else:
+                    logger.error(f"Error fetching transaction batch: {await response.text()}")
+        except Exception as e:
+            logger.error(f"Exception fetching transaction batch: {str(e)}")
+        
+        async def fetch(i: int):
+            async with self.request_semaphore:
+                results[i] = await self.fetch_solana_transaction(signatures[i])
+        
+        await asyncio.gather(*[fetch(i) for i in retry])
+        return results
+    
     async def process_solana_transaction(self, 
                                          tx_data: Dict[str, Any], 
                                          wallet_address: str) -> List[Dict[str, Any]]:
@@ -379,8 +477,8 @@ class TransactionIndexer:
                                     counterparty_mint = other_mint
                                     break
                     
-                    # Get token details
-                    name, symbol = get_token_name(mint, "solana")
+                    # Get token details - the lookup does blocking HTTP, so keep it off the event loop
+                    name, symbol = await asyncio.to_thread(get_token_name, mint, "solana")
                     
                     # Create transaction record
                     processed_txs.append({
@@ -399,7 +497,7 @@ class TransactionIndexer:
                     
                     # If we found a counterparty, add the other side of the swap
                     if counterparty_mint:
-                        counter_name, counter_symbol = get_token_name(counterparty_mint, "solana")
+                        counter_name, counter_symbol = await asyncio.to_thread(get_token_name, counterparty_mint, "solana")
                         logger.info(f"Found swap counterparty: {counter_symbol} for {symbol}")
             
             # If no token balance changes but inner instructions exist, might still be a DEX swap
@@ -460,22 +558,32 @@ class TransactionIndexer:
             total_signatures += len(signatures)
             logger.info(f"Found {len(signatures)} signatures, total so far: {total_signatures}")
             
+            # Get the page's transaction details in one batch
+            page_data = await self.fetch_solana_transactions([sig_info["signature"] for sig_info in signatures])
+            
+            # Resolve the names of every token the wallet moved on this page at once - the
+            # lookups below then come straight from the token cache
+            page_mints = {
+                balance["mint"]
+                for tx_data in page_data if tx_data and tx_data.get("meta")
+                for balance in (tx_data["meta"].get("preTokenBalances") or []) + (tx_data["meta"].get("postTokenBalances") or [])
+                if balance.get("owner") == wallet_address and balance.get("mint")
+            }
+            if page_mints:
+                await asyncio.to_thread(get_token_names, [(mint, "solana") for mint in page_mints])
+            
             # Process each transaction
-            for sig_info in signatures:
-                signature = sig_info["signature"]
-                
-                # Get transaction details
-                tx_data = await self.fetch_solana_transaction(signature)
+            page_txs = []
+            for tx_data in page_data:
                 if not tx_data:
                     continue
                 
-                # Process transaction
-                processed_txs = await self.process_solana_transaction(tx_data, wallet_address)
-                
-                # Store processed transactions
-                if processed_txs:
-                    await self.store_transactions(processed_txs)
-                    processed_count += len(processed_txs)
+                page_txs.extend(await self.process_solana_transaction(tx_data, wallet_address))
+            
+            # Store the page's processed transactions in one bulk write
+            if page_txs:
+                await self.store_transactions(page_txs)
+                processed_count += len(page_txs)
                 
             # Update pagination cursor for next batch
             if signatures:
@@ -519,20 +627,20 @@ class TransactionIndexer:
         }
         
         if start_block:
-            params["startblock"] = start_block
+            params["startblock"] = str(start_block)
             
         try:
             self.rpc_calls_this_minute += 1
-            response = requests.get(basescan_url, params=params)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("status") == "1" and "result" in data:
-                    return data["result"]
+            session = await self.get_session()
+            async with session.get(basescan_url, params=params) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if data.get("status") == "1" and "result" in data:
+                        return data["result"]
+                    else:
+                        logger.warning(f"No Base transactions for {wallet_address}: {data.get('message', 'No error message')}")
                 else:
-                    logger.warning(f"No Base transactions for {wallet_address}: {data.get('message', 'No error message')}")
-            else:
-                logger.error(f"Error fetching Base transactions: {response.text}")
+                    logger.error(f"Error fetching Base transactions: {await response.text()}")
         except Exception as e:
             logger.error(f"Exception fetching Base transactions: {str(e)}")
             
@@ -711,5 +819,6 @@ if __name__ == "__main__":
     async def main():
         count = await index_wallet(args.wallet, args.blockchain, args.full)
         print(f"Indexed {count} transactions for {args.blockchain} wallet {args.wallet}")
+        await close_http_session()
     
     asyncio.run(main())
@@ -29,7 +29,7 @@ async def test_wallet_analysis():
     
     # Test Solana wallet
     print(f"\n=== TESTING SOLANA WALLET: {solana_wallet} ===\n")
-    solana_txs = fetch_wallet_transactions(solana_wallet, "solana")
+    solana_txs = await fetch_wallet_transactions(solana_wallet, "solana")
     
     print(f"Found {len(solana_txs)} transactions for Solana wallet")
     if solana_txs:
@@ -46,7 +46,7 @@ async def test_wallet_analysis():
     
     # Test Base wallet
     print(f"\n=== TESTING BASE WALLET: {base_wallet} ===\n")
-    base_txs = fetch_wallet_transactions(base_wallet, "base")
+    base_txs = await fetch_wallet_transactions(base_wallet, "base")
     
     print(f"Found {len(base_txs)} transactions for Base wallet")
     if base_txs:
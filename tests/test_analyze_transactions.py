@@ -0,0 +1,171 @@
+"""
+Check analyze_transactions' stats and positions against a plain per-token reference implementation
+"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from server import analyze_transactions
+
+STAT_FIELDS = ("best_trade_profit", "best_multiplier", "all_time_pnl", "worst_trade_loss")
+
+def reference_stats(transactions):
+    """
+    Group by token, sort each token's trades by time and match sells against buys oldest-first
+    """
+    token_transactions = {}
+    for tx in transactions:
+        token_symbol = tx.get("token_symbol", "")
+        if token_symbol:
+            token_transactions.setdefault(token_symbol, []).append(tx)
+
+    stats = {
+        "best_trade_profit": 0.0,
+        "best_trade_token": "",
+        "best_multiplier": 0.0,
+        "best_multiplier_token": "",
+        "all_time_pnl": 0.0,
+        "worst_trade_loss": 0.0,
+        "worst_trade_token": ""
+    }
+
+    for token, txs in token_transactions.items():
+        sorted_txs = sorted(txs, key=lambda x: x.get("timestamp", 0))
+        remaining_buys = [[float(tx.get("price", 0)), float(tx.get("amount", 0))]
+                          for tx in sorted_txs if tx.get("type") == "buy" and float(tx.get("amount", 0)) > 0]
+        sells = [tx for tx in sorted_txs if tx.get("type") == "sell"]
+        if not remaining_buys or not sells:
+            continue
+
+        token_pnl = token_best_trade = token_worst_trade = token_best_multiplier = 0.0
+        for sell in sells:
+            sell_amount = float(sell.get("amount", 0))
+            sell_price = float(sell.get("price", 0))
+            if sell_amount <= 0:
+                continue
+
+            matched_sell_amount = 0.0
+            while matched_sell_amount < sell_amount and remaining_buys:
+                buy = remaining_buys[0]
+                available_amount = min(buy[1], sell_amount - matched_sell_amount)
+                if buy[0] > 0 and sell_price > 0:
+                    buy_value = available_amount * buy[0]
+                    sell_value = available_amount * sell_price
+                    trade_pnl = sell_value - buy_value
+                    token_pnl += trade_pnl
+                    token_best_trade = max(token_best_trade, trade_pnl)
+                    token_worst_trade = min(token_worst_trade, trade_pnl)
+                    if buy_value > 0:
+                        token_best_multiplier = max(token_best_multiplier, sell_value / buy_value)
+
+                buy[1] -= available_amount
+                matched_sell_amount += available_amount
+                if buy[1] <= 0:
+                    remaining_buys.pop(0)
+
+        if token_best_trade > stats["best_trade_profit"]:
+            stats["best_trade_profit"], stats["best_trade_token"] = token_best_trade, token
+        if token_worst_trade < stats["worst_trade_loss"]:
+            stats["worst_trade_loss"], stats["worst_trade_token"] = token_worst_trade, token
+        if token_best_multiplier > stats["best_multiplier"]:
+            stats["best_multiplier"], stats["best_multiplier_token"] = token_best_multiplier, token
+        stats["all_time_pnl"] += token_pnl
+
+    return stats
+
+def reference_positions(transactions):
+    """
+    Running balance, cost basis and last price per token address, keeping the open positions
+    """
+    token_data = {}
+    for tx in transactions:
+        token_address = tx.get("token_address", "")
+        token_symbol = tx.get("token_symbol", "")
+        if not token_address or not token_symbol:
+            continue
+
+        position = token_data.setdefault(token_address, {
+            "token_address": token_address,
+            "token_name": tx.get("token_name", ""),
+            "token_symbol": token_symbol,
+            "balance": 0.0,
+            "value": 0.0,
+            "cost_basis": 0.0,
+            "last_price": 0.0
+        })
+        amount = float(tx.get("amount", 0))
+        price = float(tx.get("price", 0))
+        if tx.get("type") == "buy":
+            position["balance"] += amount
+            if price > 0:
+                position["cost_basis"] += amount * price
+        elif tx.get("type") == "sell":
+            position["balance"] -= amount
+        if price > 0:
+            position["last_price"] = price
+
+    positions = []
+    for position in token_data.values():
+        if position["balance"] > 0:
+            if position["last_price"] > 0:
+                position["value"] = position["balance"] * position["last_price"]
+            positions.append(position)
+    return positions
+
+def assert_stats_match(stats, expected):
+    assert {field: stats[field] for field in STAT_FIELDS} == pytest.approx({field: expected[field] for field in STAT_FIELDS})
+    for field in ("best_trade_token", "best_multiplier_token", "worst_trade_token"):
+        assert stats[field] == expected[field]
+
+def random_transactions(rng):
+    transactions = []
+    for _ in range(rng.randint(0, 40)):
+        symbol = rng.choice(["AAA", "BBB", "CCC", ""])
+        transactions.append({
+            "token_symbol": symbol,
+            "token_address": rng.choice([symbol.lower() + "-addr", ""]) if symbol else rng.choice(["orphan-addr", ""]),
+            "token_name": symbol.title(),
+            "type": rng.choice(["buy", "buy", "sell", "sell", "transfer"]),
+            # Quarter amounts are exact in binary, and include zero and negative amounts
+            "amount": rng.choice([rng.randint(-4, 40) / 4, str(rng.randint(1, 20) / 4)]),
+            "price": rng.choice([0, 0.5, 1.25, 2.0, 4.0]),
+            "timestamp": rng.randint(0, 15)
+        })
+    return transactions
+
+def test_empty_transactions():
+    stats, positions = analyze_transactions([], True)
+    assert stats == reference_stats([])
+    assert positions == []
+    assert analyze_transactions([]) == reference_stats([])
+
+def test_mixed_tokens():
+    transactions = [
+        {"token_symbol": "AAA", "token_address": "a", "type": "buy", "amount": 10, "price": 1.0, "timestamp": 3},
+        {"token_symbol": "BBB", "token_address": "b", "type": "buy", "amount": 5, "price": 2.0, "timestamp": 1},
+        {"token_symbol": "AAA", "token_address": "a", "type": "sell", "amount": 4, "price": 3.0, "timestamp": 5},
+        {"token_symbol": "AAA", "token_address": "a", "type": "buy", "amount": 2, "price": 0.5, "timestamp": 0},
+        {"token_symbol": "", "token_address": "x", "type": "buy", "amount": 7, "price": 1.0, "timestamp": 2},
+        {"token_symbol": "BBB", "token_address": "b", "type": "transfer", "amount": 1, "price": 0, "timestamp": 2},
+        {"token_symbol": "BBB", "token_address": "b", "type": "sell", "amount": 8, "price": 1.0, "timestamp": 4},
+        {"token_symbol": "CCC", "token_address": "c", "type": "buy", "amount": 0, "price": 9.0, "timestamp": 1},
+        {"token_symbol": "CCC", "token_address": "c", "type": "sell", "amount": -3, "price": 9.0, "timestamp": 2},
+    ]
+    stats, positions = analyze_transactions(transactions, True)
+    assert_stats_match(stats, reference_stats(transactions))
+    assert_stats_match(analyze_transactions(transactions), reference_stats(transactions))
+    assert positions == reference_positions(transactions)
+
+def test_random_transactions():
+    rng = random.Random(4321)
+    for _ in range(300):
+        transactions = random_transactions(rng)
+        stats, positions = analyze_transactions(transactions, True)
+        expected = reference_stats(transactions)
+        assert_stats_match(stats, expected)
+        assert_stats_match(analyze_transactions(transactions), expected)
+        assert positions == reference_positions(transactions)
@@ -0,0 +1,96 @@
+"""
+Check the FIFO matching kernels against a plain Python reference implementation
+"""
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import pnl_kernel
+from pnl_kernel import _match_fifo, _match_fifo_vectorized, match_trades
+
+def reference_match(buy_prices, buy_amounts, sell_prices, sell_amounts):
+    """
+    Straightforward FIFO matching, as the server did it before the kernels existed
+    """
+    remaining_buys = [[price, amount] for price, amount in zip(buy_prices, buy_amounts) if amount > 0]
+    pnl = best_trade = worst_trade = best_multiplier = 0.0
+
+    for sell_price, sell_amount in zip(sell_prices, sell_amounts):
+        if sell_amount <= 0 or not remaining_buys:
+            continue
+
+        matched_sell_amount = 0.0
+        while matched_sell_amount < sell_amount and remaining_buys:
+            buy = remaining_buys[0]
+            available_amount = min(buy[1], sell_amount - matched_sell_amount)
+
+            if buy[0] > 0 and sell_price > 0:
+                buy_value = available_amount * buy[0]
+                sell_value = available_amount * sell_price
+                trade_pnl = sell_value - buy_value
+                pnl += trade_pnl
+                best_trade = max(best_trade, trade_pnl)
+                worst_trade = min(worst_trade, trade_pnl)
+                if buy_value > 0:
+                    best_multiplier = max(best_multiplier, sell_value / buy_value)
+
+            buy[1] -= available_amount
+            matched_sell_amount += available_amount
+            if buy[1] <= 0:
+                remaining_buys.pop(0)
+
+    return pnl, best_trade, worst_trade, best_multiplier
+
+# The compiled kernel, its plain Python body, the NumPy fallback and the dispatcher
+KERNELS = {
+    "match_fifo": _match_fifo,
+    "match_fifo_python": getattr(_match_fifo, "py_func", _match_fifo),
+    "match_fifo_vectorized": _match_fifo_vectorized,
+    "match_trades": match_trades,
+}
+
+CASES = {
+    "no_buys": ([], [], [2.0], [5.0]),
+    "no_sells": ([1.0], [5.0], [], []),
+    "exact_fill": ([1.0], [5.0], [3.0], [5.0]),
+    "partial_fill": ([1.0, 2.0], [4.0, 4.0], [3.0], [6.0]),
+    "sell_more_than_held": ([1.0], [2.0], [4.0, 0.5], [3.0, 10.0]),
+    "sell_split_across_buys": ([1.0, 2.0, 4.0], [1.0, 1.0, 1.0], [3.0, 1.0], [2.5, 0.5]),
+    "losing_trades": ([4.0, 2.0], [1.0, 1.0], [1.0], [2.0]),
+    "unpriced_lots": ([0.0, 1.0], [2.0, 2.0], [3.0, 0.0], [3.0, 1.0]),
+    "empty_sells": ([1.0], [2.0], [3.0, 5.0], [0.0, 2.0]),
+}
+
+def as_arrays(case):
+    return tuple(np.array(values, dtype=np.float64) for values in case)
+
+def assert_matches(result, expected):
+    assert [float(value) for value in result] == pytest.approx(list(expected), rel=1e-9, abs=1e-9)
+
+@pytest.mark.parametrize("kernel", KERNELS.values(), ids=KERNELS.keys())
+@pytest.mark.parametrize("case", CASES.values(), ids=CASES.keys())
+def test_kernel_matches_reference(kernel, case):
+    assert_matches(kernel(*as_arrays(case)), reference_match(*case))
+
+@pytest.mark.parametrize("kernel", KERNELS.values(), ids=KERNELS.keys())
+def test_kernel_matches_reference_on_random_lots(kernel):
+    rng = random.Random(1234)
+    for _ in range(500):
+        # Quarter amounts are exact in binary, so cumulative sums can't create slivers
+        buys = [(rng.choice([0.0, 0.5, 1.0, 2.0, 3.5]), rng.randint(1, 40) / 4) for _ in range(rng.randint(0, 12))]
+        sells = [(rng.choice([0.0, 0.25, 1.5, 2.0, 6.0]), rng.randint(-4, 40) / 4) for _ in range(rng.randint(0, 12))]
+        case = ([p for p, _ in buys], [a for _, a in buys], [p for p, _ in sells], [a for _, a in sells])
+        assert_matches(kernel(*as_arrays(case)), reference_match(*case))
+
+def test_match_trades_uses_vectorized_fallback_without_numba(monkeypatch):
+    calls = []
+    monkeypatch.setattr(pnl_kernel, "NUMBA_AVAILABLE", False)
+    monkeypatch.setattr(pnl_kernel, "_match_fifo_vectorized", lambda *args: calls.append(args) or _match_fifo_vectorized(*args))
+    case = tuple(values * 3 for values in CASES["sell_split_across_buys"])
+    assert_matches(match_trades(*as_arrays(case)), reference_match(*case))
+    assert len(calls) == 1